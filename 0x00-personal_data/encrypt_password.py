@@ -1,16 +1,183 @@
 #!/usr/bin/env python3
 """Module for hashing and validating passwords"""
+from concurrent.futures import Future, ProcessPoolExecutor
+from os import cpu_count, getenv
 import bcrypt
+import contextlib
+import multiprocessing
+import sys
+import threading
+import time
+
+_rounds = None
+_timings = {}
+_pool = None
+_pool_lock = threading.Lock()
+_main_lock = threading.Lock()
+
+
+class HashingPoolFull(RuntimeError):
+    """Raised when too many hashing jobs are already pending"""
+
+
+class HashingPool:
+    """Process pool running bcrypt jobs off the caller thread"""
+
+    def __init__(self, workers: int = None, max_pending: int = None,
+                 timeout: float = None) -> None:
+        """Initializes a pool of workers processes, accepting at most
+        max_pending jobs and waiting up to timeout seconds for a slot.
+        Workers are started by a forkserver, never forked from a
+        threaded caller"""
+        if workers is None:
+            workers = int(getenv("HASH_POOL_WORKERS", cpu_count() or 1))
+        if max_pending is None:
+            max_pending = int(getenv("HASH_POOL_MAX_PENDING", workers * 8))
+        if timeout is None:
+            timeout = float(getenv("HASH_POOL_TIMEOUT", 1.0))
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("forkserver"))
+
+    @property
+    def pending(self) -> int:
+        """Returns the number of jobs queued or running"""
+        return self._pending
+
+    def submit(self, fn, *args) -> Future:
+        """Queues a job, raising HashingPoolFull if no slot frees up
+        within the timeout"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HashingPoolFull("Too many pending hashing jobs")
+        with self._lock:
+            self._pending += 1
+        try:
+            with _main_hidden():
+                future = self._executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self) -> None:
+        """Frees the slot of a finished job"""
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def shutdown(self) -> None:
+        """Waits for the pending jobs and stops the workers"""
+        self._executor.shutdown(wait=True)
+
+
+@contextlib.contextmanager
+def _main_hidden():
+    """Hides the caller script from the workers started meanwhile, which
+    would run it again otherwise: jobs only call bcrypt, and scripts
+    calling hash_password at their top level have no main guard"""
+    main = sys.modules["__main__"]
+    with _main_lock:
+        saved = {"__spec__": getattr(main, "__spec__", None)}
+        if "__file__" in main.__dict__:
+            saved["__file__"] = main.__dict__.pop("__file__")
+        main.__spec__ = None
+        try:
+            yield
+        finally:
+            main.__dict__.update(saved)
+
+
+def get_pool() -> HashingPool:
+    """Returns the shared pool, created on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool()
+    return _pool
 
 
 def hash_password(password: str) -> bytes:
     """Hashes a password and returns the hashed password as bytes"""
-    hashed_pass = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-    return hashed_pass
+    return hash_password_async(password).result()
 
 
 def is_valid(hashed_password: bytes, password: str) -> bool:
     """Checks if a password matches a hashed password"""
-    checked_pass = bcrypt.checkpw(password.encode('utf-8'), hashed_password)
-    return checked_pass
+    return is_valid_async(hashed_password, password).result()
+
+
+def hash_password_async(password: str) -> Future:
+    """Future of hash_password(password), computed in the pool with the
+    cost and salt chosen by the caller process"""
+    return get_pool().submit(bcrypt.hashpw, password.encode('utf-8'),
+                             bcrypt.gensalt(get_rounds()))
+
+
+def is_valid_async(hashed_password: bytes, password: str) -> Future:
+    """Future of is_valid(hashed_password, password), computed in the
+    pool"""
+    return get_pool().submit(bcrypt.checkpw, password.encode('utf-8'),
+                             hashed_password)
+
+
+def calibrate(target_ms: float = None, min_rounds: int = None,
+              max_rounds: int = 16) -> tuple:
+    """Picks the highest bcrypt cost hashing within target_ms on this
+    machine, never below min_rounds, and returns it with the measured
+    milliseconds per cost"""
+    if target_ms is None:
+        target_ms = float(getenv("BCRYPT_TARGET_MS", 250))
+    if min_rounds is None:
+        min_rounds = int(getenv("BCRYPT_MIN_ROUNDS", 12))
+    chosen = min_rounds
+    timings = {}
+    for rounds in range(min_rounds, max_rounds + 1):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds))
+        timings[rounds] = (time.perf_counter() - start) * 1000
+        if timings[rounds] > target_ms:
+            break
+        chosen = rounds
+    return chosen, timings
+
+
+def get_rounds() -> int:
+    """Returns the bcrypt cost of new hashes: BCRYPT_ROUNDS when set,
+    calibrated on first use otherwise"""
+    global _rounds, _timings
+    if _rounds is None:
+        with _pool_lock:
+            if _rounds is None:
+                if getenv("BCRYPT_ROUNDS"):
+                    _rounds = int(getenv("BCRYPT_ROUNDS"))
+                else:
+                    _rounds, _timings = calibrate()
+    return _rounds
+
+
+def needs_rehash(hashed_password: bytes) -> bool:
+    """Checks if a hashed password was made with a lower cost than the
+    current one, or another one if BCRYPT_ALLOW_DOWNGRADE is set"""
+    try:
+        rounds = int(hashed_password.split(b"$")[2])
+    except (IndexError, ValueError):
+        return True
+    if getenv("BCRYPT_ALLOW_DOWNGRADE"):
+        return rounds != get_rounds()
+    return rounds < get_rounds()
+
 
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        _rounds, _timings = calibrate(float(sys.argv[1]))
+    print("bcrypt cost: {}".format(get_rounds()))
+    for cost, ms in sorted(_timings.items()):
+        print("  cost {:>2}: {:>8.1f} ms".format(cost, ms))
@@ -3,7 +3,37 @@
 Class to manage API authentication
 """
 from flask import request
-from typing import List, TypeVar
+from functools import lru_cache
+from os import getenv
+from typing import Callable, List, TypeVar
+import re
+
+
+def compile_excluded_paths(excluded_paths: List[str]) -> Callable:
+    """
+    Compile excluded paths into one regex: a path ending with '*'
+    excludes every path starting with the part before the '*', any
+    other path excludes itself (with or without a trailing '/')
+    """
+    patterns = []
+    for excluded_path in excluded_paths:
+        if excluded_path.endswith('*'):
+            patterns.append(re.escape(excluded_path[:-1]))
+        elif excluded_path.endswith('/'):
+            patterns.append(re.escape(excluded_path) + '$')
+        else:
+            patterns.append(re.escape(excluded_path + '/') + '$')
+    regex = re.compile('(?:{})'.format('|'.join(patterns)))
+
+    @lru_cache(maxsize=int(getenv('AUTH_PATH_CACHE_SIZE', 1024)))
+    def is_excluded(path: str) -> bool:
+        """
+        Check if path is excluded
+        """
+        if not path.endswith('/'):
+            path += '/'
+        return regex.match(path) is not None
+    return is_excluded
 
 
 class Auth():
@@ -17,21 +47,11 @@ class Auth():
         if path is None or excluded_paths is None or not len(excluded_paths):
             return True
 
-        if not path.endswith('/'):
-            path += '/'
-        if not excluded_paths[-1].endswith('/'):
-            excluded_paths += '/'
-
-        firts_last = [path[:-1]
-                     for path in excluded_paths if path[-1] == '*']
-
-        for path in firts_last:
-            if path in path:
-                return False
-
-        if path in excluded_paths:
-            return False
-        return True
+        key = tuple(excluded_paths)
+        if getattr(self, '_excluded_key', None) != key:
+            self._excluded_matcher = compile_excluded_paths(excluded_paths)
+            self._excluded_key = key
+        return not self._excluded_matcher(path)
 
     def authorization_header(self, request=None) -> str:
         """
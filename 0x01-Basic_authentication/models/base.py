@@ -10,11 +10,13 @@ import uuid
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 DATA = {}
+INDEX = {}
 
 
 class Base():
     """ Base model
     """
+    indexed_attributes: List[str] = []
 
     def __init__(self, *args: list, **kwargs: dict) -> None:
         """ Initialize a Base instance
@@ -57,6 +59,50 @@ class Base():
                 result[key] = value
         return result
 
+    @classmethod
+    def _index_init(cls) -> None:
+        """ Reset the secondary indexes of the class
+        """
+        INDEX[cls.__name__] = {
+            'values': {},
+            'attrs': {attr: {} for attr in cls.indexed_attributes}
+        }
+
+    def _index_add(self) -> None:
+        """ Add current object to the secondary indexes
+        """
+        instance = self.__class__.__name__
+        if instance not in INDEX:
+            self.__class__._index_init()
+        index = INDEX[instance]
+        self._index_remove()
+        values = {}
+        for attr, entries in index['attrs'].items():
+            value = getattr(self, attr, None)
+            try:
+                entries.setdefault(value, set()).add(self.id)
+            except TypeError:
+                continue
+            values[attr] = value
+        index['values'][self.id] = values
+
+    def _index_remove(self) -> None:
+        """ Remove current object from the secondary indexes
+        """
+        index = INDEX.get(self.__class__.__name__)
+        if index is None:
+            return
+        values = index['values'].pop(self.id, None)
+        if values is None:
+            return
+        for attr, value in values.items():
+            ids = index['attrs'][attr].get(value)
+            if ids is None:
+                continue
+            ids.discard(self.id)
+            if len(ids) == 0:
+                del index['attrs'][attr][value]
+
     @classmethod
     def load_from_file(cls) -> None:
         """ Load all objects from file
@@ -64,13 +110,16 @@ class Base():
         instance = cls.__name__
         file_path = ".db_{}.json".format(instance)
         DATA[instance] = {}
+        cls._index_init()
         if not path.exists(file_path):
             return
 
         with open(file_path, 'r') as f:
             objs_json = json.load(f)
             for obj_id, obj_json in objs_json.items():
-                DATA[instance][obj_id] = cls(**obj_json)
+                obj = cls(**obj_json)
+                DATA[instance][obj_id] = obj
+                obj._index_add()
 
     @classmethod
     def save_to_file(cls) -> None:
@@ -91,6 +140,7 @@ class Base():
         instance = self.__class__.__name__
         self.updated_at = datetime.utcnow()
         DATA[instance][self.id] = self
+        self._index_add()
         self.__class__.save_to_file()
 
     def remove(self) -> None:
@@ -99,6 +149,7 @@ class Base():
         instance = self.__class__.__name__
         if DATA[instance].get(self.id) is not None:
             del DATA[instance][self.id]
+            self._index_remove()
             self.__class__.save_to_file()
 
     @classmethod
@@ -121,6 +172,32 @@ class Base():
         instance = cls.__name__
         return DATA[instance].get(id)
 
+    @classmethod
+    def _index_candidates(cls, attributes: dict) -> List[TypeVar('Base')]:
+        """ Return objects matching the indexed part of attributes,
+            None if no indexed attribute can be used
+        """
+        instance = cls.__name__
+        index = INDEX.get(instance)
+        if index is None:
+            return None
+        ids = None
+        for k, v in attributes.items():
+            entries = index['attrs'].get(k)
+            if entries is None:
+                continue
+            try:
+                found = entries.get(v, set())
+            except TypeError:
+                continue
+            ids = set(found) if ids is None else ids & found
+            if len(ids) == 0:
+                break
+        if ids is None:
+            return None
+        objs = DATA[instance]
+        return [objs[obj_id] for obj_id in ids if obj_id in objs]
+
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """ Search all objects with matching attributes
@@ -134,5 +211,10 @@ class Base():
                 if (getattr(obj, k) != v):
                     return False
             return True
-        return list(filter(_search, DATA[instance].values()))
+        candidates = None
+        if len(attributes) > 0:
+            candidates = cls._index_candidates(attributes)
+        if candidates is None:
+            candidates = DATA[instance].values()
+        return list(filter(_search, candidates))
 
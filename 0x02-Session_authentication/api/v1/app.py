@@ -3,6 +3,8 @@
 Route module for the API
 """
 from os import getenv
+import logging
+import time
 
 from api.v1.views import app_views
 from flask import Flask, jsonify, abort, request
@@ -12,6 +14,8 @@ from flask_cors import (CORS, cross_origin)
 app = Flask(__name__)
 app.register_blueprint(app_views)
 CORS(app, resources={r"/api/v1/*": {"origins": "*"}})
+logger = logging.getLogger(__name__)
+server_timing = getenv("AUTH_SERVER_TIMING") is not None
 
 auth = None
 
@@ -30,6 +34,10 @@ elif getenv('AUTH_TYPE') == 'session_exp_auth':
 elif getenv('AUTH_TYPE') == 'session_db_auth':
     from api.v1.auth.session_db_auth import SessionDBAuth
     auth = SessionDBAuth()
+elif getenv('AUTH_TYPE') == 'session_token_auth':
+    from api.v1.auth.session_token_auth import SessionTokenAuth
+    auth = SessionTokenAuth()
+app.extensions['auth'] = auth
 
 
 @app.errorhandler(404)
@@ -63,17 +71,37 @@ def before_request() -> None:
         '/api/v1/forbidden/',
         '/api/v1/auth_session/login/']
     if auth:
+        start = time.perf_counter()
         if auth.require_auth(request.path, request_path_list):
-            if auth.authorization_header(
-                    request) is None and auth.session_cookie(request) is None:
+            require_auth_time = time.perf_counter() - start
+            request.auth_context = auth.resolve_request(request)
+            request.auth_context["timings"]["require_auth"] = \
+                require_auth_time
+            if request.auth_context["source"] is None:
                 abort(401)
-            request.current_user = auth.current_user(request)
-            if auth.current_user(request) is None:
-                abort(403)
+            request.current_user = request.auth_context["user"]
             if request.current_user is None:
                 abort(403)
 
 
+@app.after_request
+def after_request(response):
+    """ Log the auth timings of the request, and send them in a
+    Server-Timing header only when AUTH_SERVER_TIMING is set, since
+    they tell clients which auth stages ran
+    """
+    context = getattr(request, "auth_context", None)
+    if context is None:
+        return response
+    timings = ", ".join(
+        "auth-{};dur={:.3f}".format(stage.replace("_", "-"), seconds * 1000)
+        for stage, seconds in context["timings"].items())
+    logger.debug("%s %s %s", request.method, request.path, timings)
+    if server_timing:
+        response.headers["Server-Timing"] = timings
+    return response
+
+
 if __name__ == "__main__":
     host = getenv("API_HOST", "0.0.0.0")
     port = getenv("API_PORT", "5000")
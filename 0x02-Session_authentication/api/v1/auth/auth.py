@@ -4,13 +4,45 @@ Module provides authentication system for API
 """
 from os import getenv
 from flask import request
-from typing import List
+from functools import lru_cache
+from typing import Callable, List
+import re
+import time
+
+
+def compile_excluded_uris(excluded_uris: List[str]) -> Callable:
+    """
+    Compile excluded paths into one regex
+
+    A path ending with "*" excludes every uri starting with the part
+    before the "*", any other path excludes itself and its sub paths
+
+    Args:
+        excluded_uris (List[str]): List of excluded paths
+
+    Returns:
+        Callable: memoized function telling if an uri is excluded
+    """
+    patterns = []
+    for excluded_path in excluded_uris:
+        if excluded_path.endswith("*"):
+            patterns.append(re.escape(excluded_path[:-1]))
+        else:
+            patterns.append(re.escape(excluded_path.rstrip("/") + "/"))
+    regex = re.compile("(?:{})".format("|".join(patterns)))
+
+    @lru_cache(maxsize=int(getenv("AUTH_PATH_CACHE_SIZE", 1024)))
+    def is_excluded(uri: str) -> bool:
+        """ Check if uri starts with an excluded path """
+        return regex.match(uri.rstrip("/") + "/") is not None
+    return is_excluded
 
 
 class Auth:
     """
     Class for managing authentication in API
     """
+    credentials_source = "header"
 
     def require_auth(self, uri: str, excluded_uris: List[str]) -> bool:
         """
@@ -26,16 +58,11 @@ class Auth:
         if not uri or not excluded_uris:
             return True
 
-        uri = uri.rstrip("/") + "/"
-        excluded_uris = [p.rstrip("/") + "/" for p in excluded_uris]
-
-        for excluded_path in excluded_uris:
-            if uri.startswith(excluded_path):
-                return False
-
-        if uri in excluded_uris:
-            return False
-        return True
+        key = tuple(excluded_uris)
+        if getattr(self, "_excluded_key", None) != key:
+            self._excluded_matcher = compile_excluded_uris(excluded_uris)
+            self._excluded_key = key
+        return not self._excluded_matcher(uri)
 
     def authorization_header(self, request=None) -> str:
         """
@@ -63,6 +90,40 @@ class Auth:
         """
         return None
 
+    def resolve_request(self, request=None) -> dict:
+        """
+        Resolve the principal of a request once
+
+        Args:
+            request: Flask request object
+
+        Returns:
+            dict: user, source of the credentials the user is resolved
+            from ("header" or "cookie", the one read by current_user when
+            present, None when the request has none), session_id and the
+            seconds spent on each stage
+        """
+        context = {"user": None, "source": None, "session_id": None,
+                   "timings": {}}
+        start = time.perf_counter()
+        header = self.authorization_header(request)
+        cookie = self.session_cookie(request)
+        credentials_end = time.perf_counter()
+        context["timings"]["credentials"] = credentials_end - start
+        if header is None and cookie is None:
+            return context
+        if self.credentials_source == "cookie":
+            source = "cookie" if cookie is not None else "header"
+        else:
+            source = "header" if header is not None else "cookie"
+        context["source"] = source
+        if source == "cookie":
+            context["session_id"] = cookie
+        context["user"] = self.current_user(request)
+        context["timings"]["current_user"] = \
+            time.perf_counter() - credentials_end
+        return context
+
     def session_cookie(self, request=None):  # -> Any | None:
         """
         Get session cookie from request
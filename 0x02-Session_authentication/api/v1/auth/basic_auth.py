@@ -3,12 +3,30 @@
 """
 from typing import TypeVar, Tuple
 from base64 import b64decode, decode
+from collections import OrderedDict
+from os import getenv
 from api.v1.auth.auth import Auth
 from models.user import User
 import base64
+import hashlib
+import hmac
+import secrets
+import threading
+import time
 
 
 class BasicAuth(Auth):
+    credentials_cache_ttl = float(getenv("BASIC_AUTH_CACHE_TTL", 60))
+    credentials_cache_size = int(getenv("BASIC_AUTH_CACHE_SIZE", 1024))
+
+    def __init__(self) -> None:
+        """Initialize the verified credentials cache"""
+        self._cache_key = secrets.token_bytes(32)
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_counters = {"hits": 0, "misses": 0,
+                               "hit_seconds": 0.0, "miss_seconds": 0.0}
+
     def decode_base64_authorization_header(self, b64_auth_header: str) -> str:
         """Returns decode base64 authorization"""
         if b64_auth_header is None or not isinstance(b64_auth_header, str):
@@ -61,11 +79,70 @@ class BasicAuth(Auth):
                 return user
             return None
 
+    def cached_user(self, digest: bytes) -> TypeVar("User"):
+        """Returns the user of a verified Authorization header digest,
+        None if unknown, expired, removed or its credentials changed"""
+        now = time.monotonic()
+        with self._cache_lock:
+            entry = self._cache.get(digest)
+            if entry is None:
+                return None
+            user_id, email, password, expires = entry
+            if expires < now:
+                del self._cache[digest]
+                return None
+            self._cache.move_to_end(digest)
+        user = User.get(user_id)
+        if user is None or user.email != email or \
+                user.password != password:
+            with self._cache_lock:
+                self._cache.pop(digest, None)
+            return None
+        return user
+
+    def cache_user(self, digest: bytes, user: TypeVar("User")) -> None:
+        """Remembers the user of a verified Authorization header digest"""
+        expires = time.monotonic() + self.credentials_cache_ttl
+        with self._cache_lock:
+            self._cache[digest] = (user.id, user.email, user.password,
+                                   expires)
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self.credentials_cache_size:
+                self._cache.popitem(last=False)
+
     def current_user(self, request=None) -> TypeVar("User"):
         """Overloads Basic authentication"""
         authantication_head = self.authorization_header(request)
         if not authantication_head:
             return None
+        start = time.perf_counter()
+        digest = hmac.new(self._cache_key, authantication_head.encode(),
+                          hashlib.sha256).digest()
+        user = self.cached_user(digest)
+        if user is not None:
+            self._count("hits", "hit_seconds", time.perf_counter() - start)
+            return user
+        user = self.verify_user(authantication_head)
+        if user is not None:
+            self.cache_user(digest, user)
+        self._count("misses", "miss_seconds",
+                    time.perf_counter() - start)
+        return user
+
+    def _count(self, counter: str, timer: str, seconds: float) -> None:
+        """Counts a cache hit or miss and the time it took"""
+        with self._cache_lock:
+            self.cache_counters[counter] += 1
+            self.cache_counters[timer] += seconds
+
+    def cache_stats(self) -> dict:
+        """Returns a copy of the cache counters"""
+        with self._cache_lock:
+            return dict(self.cache_counters)
+
+    def verify_user(self, authantication_head: str) -> TypeVar("User"):
+        """Returns the user of an Authorization header, checking
+        its credentials"""
         base64_exct = self.extract_base64_authorization_header(authantication_head)
         base64_dec = self.decode_base64_authorization_header(base64_exct)
         user_data = self.extract_user_credentials(base64_dec)
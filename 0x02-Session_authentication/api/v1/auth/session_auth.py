@@ -4,7 +4,9 @@ Session Authentication
 """
 from typing import Dict
 from flask.globals import session
+from os import getenv
 from api.v1.auth.auth import Auth
+from api.v1.auth.session_store import SQLiteSessionStore
 from models.user import User
 import uuid
 
@@ -12,6 +14,15 @@ import uuid
 class SessionAuth(Auth):
     """ Session class inherits Auth """
     user_id_by_session_id: Dict[str, str] = {}
+    credentials_source = "cookie"
+
+    def __init__(self) -> None:
+        """ Share sessions between processes through a SQLite file
+        when SESSION_STORE is sqlite """
+        if getenv("SESSION_STORE") == "sqlite":
+            self.user_id_by_session_id = SQLiteSessionStore(
+                getenv("SESSION_STORE_PATH", ".db_sessions.sqlite"),
+                getattr(self, "session_duration", 0))
 
     def create_session(self, user_id: str = None) -> str:
         """ Session ID Generator """
@@ -34,12 +45,21 @@ class SessionAuth(Auth):
         user_id = User.get(session_user_id)
         return user_id
 
+    def session_resolved(self, request, session_id: str) -> bool:
+        """ Check if the auth context of the request already
+        resolved a user from session_id """
+        context = getattr(request, "auth_context", None)
+        return context is not None and \
+            context.get("session_id") == session_id and \
+            context.get("user") is not None
+
     def destroy_session(self, request=None):
         """ Deletes user session / login(out) """
         cookie_data = self.session_cookie(request)
         if cookie_data is None:
             return False
-        if not self.user_id_for_session_id(cookie_data):
+        if not self.session_resolved(request, cookie_data) and \
+                not self.user_id_for_session_id(cookie_data):
             return False
         del self.user_id_by_session_id[cookie_data]
         return True
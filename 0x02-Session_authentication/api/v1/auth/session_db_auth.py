@@ -3,12 +3,46 @@
 Session database class
 """
 from datetime import datetime, timedelta, timedelta
+from os import getenv
 from api.v1.auth.session_exp_auth import SessionExpAuth
 from models.user_session import UserSession
 
 
 class SessionDBAuth(SessionExpAuth):
-    """ SessionDBAuth class """
+    """ SessionDBAuth class
+
+    Sessions are loaded once and looked up in the in-memory session_id
+    index of UserSession, which is refreshed from the changes made on
+    disk at most every SESSION_DB_SYNC_INTERVAL seconds
+    With sliding expiration, buffered accesses are written by saving
+    the touched sessions in one batch, which moves their updated_at
+    """
+    def __init__(self) -> None:
+        """ Load the stored sessions """
+        super().__init__()
+        self.sync_interval = float(getenv("SESSION_DB_SYNC_INTERVAL", 1))
+        UserSession.load_from_file()
+
+    @property
+    def session_counters(self) -> dict:
+        """ Returns the stored UserSession count, the parallel in-memory
+        sessions reaped by the wheel do not reflect the stored ones """
+        counters = {"active": UserSession.count()}
+        if self.sliding:
+            counters["touches"] = dict(self.touch_counters)
+        return counters
+
+    def now(self) -> datetime:
+        """ Returns the current time, in UTC like UserSession dates """
+        return datetime.utcnow()
+
+    def _write_touches(self, touches: dict) -> None:
+        """ Saves the touched sessions in one write """
+        user_sessions = []
+        for session_id in touches:
+            user_sessions += UserSession.search({'session_id': session_id})
+        UserSession.save_many(user_sessions)
+
     def create_session(self, user_id=None):
         """ Session ID generator """
         session_id = super().create_session(user_id)
@@ -22,15 +56,19 @@ class SessionDBAuth(SessionExpAuth):
         """ Returns user_id from session_id """
         if session_id is None:
             return None
-        UserSession.load_from_file()
+        UserSession.sync(self.sync_interval)
         is_valid_user = UserSession.search({'session_id': session_id})
         if not is_valid_user:
             return None
         is_valid_user = is_valid_user[0]
         start_time = is_valid_user.created_at
+        if self.sliding:
+            start_time = self.touches.get(session_id) or \
+                is_valid_user.updated_at
         time_delta = timedelta(seconds=self.session_duration)
-        if (start_time + time_delta) < datetime.now():
+        if (start_time + time_delta) < self.now():
             return None
+        self._touch(session_id, start_time)
         return is_valid_user.user_id
 
     def destroy_session(self, request=None):
@@ -38,7 +76,8 @@ class SessionDBAuth(SessionExpAuth):
         cookie_data = self.session_cookie(request)
         if cookie_data is None:
             return False
-        if not self.user_id_for_session_id(cookie_data):
+        if not self.session_resolved(request, cookie_data) and \
+                not self.user_id_for_session_id(cookie_data):
             return False
         user_session = UserSession.search({'session_id': cookie_data})
         if not user_session:
@@ -46,7 +85,6 @@ class SessionDBAuth(SessionExpAuth):
         user_session = user_session[0]
         try:
             user_session.remove()
-            UserSession.save_to_file()
         except Exception:
             return False
         return True
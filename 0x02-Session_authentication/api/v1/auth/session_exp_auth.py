@@ -7,6 +7,61 @@ It inherits from SessionAuth
 from os import getenv
 from datetime import datetime, timedelta
 from api.v1.auth.session_auth import SessionAuth
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryWheel():
+    """
+    Timing wheel of session expiration times
+    Each slot holds the session ids expiring during the ticks mapped to
+    it, and the wheel spans one session duration, so advancing it only
+    visits the sessions expired since the last advance
+    The tick is widened so that the wheel holds at most slots + 2 slots
+    whatever the duration
+    """
+
+    def __init__(self, duration: float, tick: float,
+                 slots: int = 4096) -> None:
+        """ Initializes a wheel covering duration seconds """
+        self.tick = max(tick, duration / max(1, slots))
+        self.slots = [set() for _ in range(int(duration / self.tick) + 2)]
+        self.cursor = int(time.time() // self.tick)
+        self.lock = threading.Lock()
+
+    def _slot(self, expires: float) -> set:
+        """ Returns the slot of an expiration timestamp """
+        return self.slots[int(expires // self.tick) % len(self.slots)]
+
+    def add(self, session_id: str, expires: float) -> None:
+        """ Schedules session_id to expire at expires """
+        with self.lock:
+            self._slot(expires).add(session_id)
+
+    def discard(self, session_id: str, expires: float) -> None:
+        """ Unschedules session_id """
+        with self.lock:
+            self._slot(expires).discard(session_id)
+
+    def advance(self, now: float) -> list:
+        """
+        Empties the slots of the ticks elapsed before now and returns
+        their session ids
+        """
+        current = int(now // self.tick)
+        due = []
+        with self.lock:
+            for tick in range(self.cursor,
+                              min(current, self.cursor + len(self.slots))):
+                slot = self.slots[tick % len(self.slots)]
+                due.extend(slot)
+                slot.clear()
+            self.cursor = max(self.cursor, current)
+        return due
 
 
 class SessionExpAuth(SessionAuth):
@@ -17,12 +72,145 @@ class SessionExpAuth(SessionAuth):
         Initializes the SessionExpAuth class
         It sets the session duration based on the SESSION_DURATION env variable
         If the variable is not set or is not an integer, it defaults to 0
+        Expiring sessions are removed by a background reaper every
+        SESSION_REAPER_TICK seconds, from a timing wheel of at most
+        SESSION_WHEEL_SLOTS slots or, with a shared session store, by
+        purging the store
+        When SESSION_SLIDING is set, sessions expire SESSION_DURATION
+        after their last access instead: accesses are buffered, at most
+        one per SESSION_TOUCH_GRANULARITY seconds per session, capped
+        to a quarter of the duration, and written in one batch on every
+        reaper tick
         """
         try:
             self.session_duration = int(getenv("SESSION_DURATION"))
         except Exception as error:
             print(error)
             self.session_duration = 0
+        super().__init__()
+        self.reaped = 0
+        self.expiry = None
+        self.reaper_tick = float(getenv("SESSION_REAPER_TICK", 1))
+        self.sliding = getenv("SESSION_SLIDING") is not None
+        self.touch_granularity = float(
+            getenv("SESSION_TOUCH_GRANULARITY", 60))
+        if self.session_duration > 0:
+            self.touch_granularity = min(self.touch_granularity,
+                                         self.session_duration / 4)
+        self.touches = {}
+        self.touches_lock = threading.Lock()
+        self.touch_counters = {"buffered": 0, "flushed": 0, "batches": 0}
+        if self.session_duration > 0:
+            if not hasattr(self.user_id_by_session_id, "purge"):
+                self.expiry = ExpiryWheel(
+                    self.session_duration, self.reaper_tick,
+                    int(getenv("SESSION_WHEEL_SLOTS", 4096)))
+            threading.Thread(target=self._reap_loop, daemon=True).start()
+
+    @property
+    def session_counters(self) -> dict:
+        """ Returns the active and reaped session counts """
+        counters = {"active": len(self.user_id_by_session_id),
+                    "reaped": self.reaped}
+        if self.sliding:
+            counters["touches"] = dict(self.touch_counters)
+        return counters
+
+    def now(self) -> datetime:
+        """ Returns the current time, in the clock of the sessions """
+        return datetime.now()
+
+    def _last_access(self, session_object) -> datetime:
+        """ Returns the time expiration of a session object counts from """
+        if self.sliding and "last_access" in session_object:
+            return session_object["last_access"]
+        return session_object["created_at"]
+
+    def _expires(self, session_object) -> float | None:
+        """ Returns the expiration timestamp of a session object """
+        if not isinstance(session_object, dict) or \
+                "created_at" not in session_object:
+            return None
+        return self._last_access(session_object).timestamp() + \
+            self.session_duration
+
+    def _touch(self, session_id: str, last_access: datetime) -> None:
+        """ Buffers an access to a session last accessed at last_access,
+        unless it is within the touch granularity """
+        if not self.sliding:
+            return
+        now = self.now()
+        if (now - last_access).total_seconds() < self.touch_granularity:
+            return
+        with self.touches_lock:
+            if session_id not in self.touches:
+                self.touch_counters["buffered"] += 1
+            self.touches[session_id] = now
+
+    def _write_touches(self, touches: dict) -> None:
+        """ Stores the last access times of touches """
+        store = self.user_id_by_session_id
+        if hasattr(store, "touch_many"):
+            store.touch_many(touches)
+            return
+        for session_id, last_access in touches.items():
+            session_object = store.get(session_id)
+            if isinstance(session_object, dict):
+                session_object["last_access"] = last_access
+
+    def flush_touches(self) -> int:
+        """ Writes the buffered accesses in one batch and returns their
+        count, buffering them again when the write fails """
+        with self.touches_lock:
+            touches, self.touches = self.touches, {}
+        if len(touches) == 0:
+            return 0
+        try:
+            self._write_touches(touches)
+        except Exception:
+            with self.touches_lock:
+                for session_id, last_access in touches.items():
+                    self.touches.setdefault(session_id, last_access)
+            raise
+        self.touch_counters["flushed"] += len(touches)
+        self.touch_counters["batches"] += 1
+        return len(touches)
+
+    def reap(self, now: float = None) -> int:
+        """
+        Removes the sessions expired before now and returns their count
+        """
+        if now is None:
+            now = time.time()
+        self.flush_touches()
+        if hasattr(self.user_id_by_session_id, "purge"):
+            reaped = self.user_id_by_session_id.purge(now)
+            self.reaped += reaped
+            return reaped
+        if self.expiry is None:
+            return 0
+        reaped = 0
+        for session_id in self.expiry.advance(now):
+            expires = self._expires(self.user_id_by_session_id.get(session_id))
+            if expires is None:
+                continue
+            if expires < now:
+                self.user_id_by_session_id.pop(session_id, None)
+                reaped += 1
+            else:
+                self.expiry.add(session_id, expires)
+        self.reaped += reaped
+        return reaped
+
+    def _reap_loop(self) -> None:
+        """ Background reaper, logging the failed ticks and retrying on
+        the next one """
+        while True:
+            time.sleep(self.reaper_tick)
+            try:
+                self.reap()
+            except Exception:
+                logger.exception("Session reaping failed")
 
     def user_id_for_session_id(self, session_id=None) -> None | str:
         """
@@ -31,17 +219,19 @@ class SessionExpAuth(SessionAuth):
         """
         if session_id is None:
             return None
-        if session_id not in self.user_id_by_session_id:
+        session_object = self.user_id_by_session_id.get(session_id)
+        if session_object is None:
             return None
-        session_object = self.user_id_by_session_id[session_id]
         if self.session_duration <= 0:
             return session_object["user_id"]
         if "created_at" not in session_object:
             return None
-        created_at = session_object["created_at"]
+        last_access = self.touches.get(session_id) or \
+            self._last_access(session_object)
         time_delta = timedelta(seconds=self.session_duration)
-        if created_at + time_delta < datetime.now():
+        if last_access + time_delta < self.now():
             return None
+        self._touch(session_id, last_access)
         return session_object["user_id"]
 
     def create_session(self, user_id=None) -> None | str:
@@ -53,8 +243,18 @@ class SessionExpAuth(SessionAuth):
         id_of_session = super().create_session(user_id)
         if id_of_session is None:
             return None
-        self.user_id_by_session_id[id_of_session] = {
-            "user_id": user_id, "created_at": datetime.now()
-        }
+        session_object = {"user_id": user_id, "created_at": datetime.now()}
+        self.user_id_by_session_id[id_of_session] = session_object
+        if self.expiry is not None:
+            self.expiry.add(id_of_session, self._expires(session_object))
         return id_of_session
 
+    def destroy_session(self, request=None):
+        """ Deletes user session and unschedules its expiration """
+        session_id = self.session_cookie(request)
+        expires = self._expires(self.user_id_by_session_id.get(session_id))
+        if not super().destroy_session(request):
+            return False
+        if self.expiry is not None and expires is not None:
+            self.expiry.discard(session_id, expires)
+        return True
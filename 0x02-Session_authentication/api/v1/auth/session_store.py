@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Shared session and revoked token stores
+"""
+from collections.abc import MutableMapping
+from datetime import datetime
+from os import getenv
+import sqlite3
+import threading
+import time
+
+
+class SQLiteSessionStore(MutableMapping):
+    """ Session store on a SQLite file in WAL mode
+
+    Drop-in replacement of the user_id_by_session_id dict shared by
+    every worker process: values are user ids, or {"user_id",
+    "created_at", "last_access"} dicts for the expiring session types,
+    whose rows get an indexed expires_at column so expired ones can be
+    purged in batches. One connection per process is shared by every
+    thread behind a lock, statements being far shorter than a connect
+    """
+
+    def __init__(self, file_path: str, duration: int = 0) -> None:
+        """ Open the store and create its table """
+        self.file_path = file_path
+        self.duration = duration
+        self.purge_batch = int(getenv("SESSION_PURGE_BATCH", 1000))
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(file_path, timeout=5,
+                                          check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.lock, self.connection as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, user_id TEXT NOT NULL, "
+                "created_at REAL, accessed_at REAL, expires_at REAL) "
+                "WITHOUT ROWID")
+            columns = [row[1] for row in connection.execute(
+                "PRAGMA table_info(sessions)")]
+            if "accessed_at" not in columns:
+                connection.execute(
+                    "ALTER TABLE sessions ADD COLUMN accessed_at REAL")
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS sessions_expires_at "
+                "ON sessions (expires_at)")
+
+    def __getitem__(self, session_id):
+        """ Returns the value of an unexpired session """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT user_id, created_at, accessed_at FROM sessions "
+                "WHERE session_id = ? "
+                "AND (expires_at IS NULL OR expires_at >= ?)",
+                (session_id, time.time())).fetchone()
+        if row is None:
+            raise KeyError(session_id)
+        if row[1] is None:
+            return row[0]
+        value = {"user_id": row[0],
+                 "created_at": datetime.fromtimestamp(row[1])}
+        if row[2] is not None:
+            value["last_access"] = datetime.fromtimestamp(row[2])
+        return value
+
+    def __setitem__(self, session_id, value) -> None:
+        """ Inserts or replaces a session """
+        created_at = accessed_at = expires_at = None
+        user_id = value
+        if isinstance(value, dict):
+            user_id = value["user_id"]
+            created_at = value["created_at"].timestamp()
+            if "last_access" in value:
+                accessed_at = value["last_access"].timestamp()
+            if self.duration > 0:
+                expires_at = (accessed_at or created_at) + self.duration
+        with self.lock, self.connection as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, user_id, "
+                "created_at, accessed_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (session_id, user_id, created_at, accessed_at, expires_at))
+
+    def touch_many(self, touches: dict) -> None:
+        """ Sets the last access time of sessions, and moves their
+        expiration after it, in one transaction """
+        rows = []
+        for session_id, last_access in touches.items():
+            accessed_at = last_access.timestamp()
+            expires_at = None
+            if self.duration > 0:
+                expires_at = accessed_at + self.duration
+            rows.append((accessed_at, expires_at, session_id))
+        with self.lock, self.connection as connection:
+            connection.executemany(
+                "UPDATE sessions SET accessed_at = ?, expires_at = ? "
+                "WHERE session_id = ? AND created_at IS NOT NULL", rows)
+
+    def __delitem__(self, session_id) -> None:
+        """ Deletes a session, doing nothing when it is already gone,
+        so concurrent logouts both succeed """
+        with self.lock, self.connection as connection:
+            connection.execute("DELETE FROM sessions WHERE session_id = ?",
+                               (session_id,))
+
+    def __iter__(self):
+        """ Iterates over the session ids """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT session_id FROM sessions").fetchall()
+        return (row[0] for row in rows)
+
+    def __len__(self) -> int:
+        """ Returns the number of stored sessions """
+        with self.lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def purge(self, now: float = None) -> int:
+        """ Deletes the sessions expired before now, purge_batch rows
+        per transaction, and returns their count """
+        if now is None:
+            now = time.time()
+        purged = 0
+        while True:
+            with self.lock, self.connection as connection:
+                deleted = connection.execute(
+                    "DELETE FROM sessions WHERE session_id IN ("
+                    "SELECT session_id FROM sessions WHERE expires_at < ? "
+                    "LIMIT ?)", (now, self.purge_batch)).rowcount
+            purged += deleted
+            if deleted < self.purge_batch:
+                return purged
+
+
+class SQLiteRevokedTokens(MutableMapping):
+    """ Revoked session tokens on a SQLite file in WAL mode
+
+    Drop-in replacement of the token id -> expiration time dict of
+    SessionTokenAuth shared by every worker process, so a logout in one
+    worker revokes the token in all of them. Rows of expired tokens are
+    purged in batches
+    """
+
+    def __init__(self, file_path: str) -> None:
+        """ Open the store and create its table """
+        self.file_path = file_path
+        self.purge_batch = int(getenv("SESSION_PURGE_BATCH", 1000))
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(file_path, timeout=5,
+                                          check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.lock, self.connection as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS revoked_tokens ("
+                "token_id TEXT PRIMARY KEY, expires_at REAL NOT NULL) "
+                "WITHOUT ROWID")
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS revoked_tokens_expires_at "
+                "ON revoked_tokens (expires_at)")
+
+    def __getitem__(self, token_id):
+        """ Returns the expiration time of a revoked token """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT expires_at FROM revoked_tokens WHERE token_id = ?",
+                (token_id,)).fetchone()
+        if row is None:
+            raise KeyError(token_id)
+        return row[0]
+
+    def __setitem__(self, token_id, expires) -> None:
+        """ Revokes a token until expires """
+        with self.lock, self.connection as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO revoked_tokens (token_id, "
+                "expires_at) VALUES (?, ?)", (token_id, expires))
+
+    def __delitem__(self, token_id) -> None:
+        """ Forgets a revoked token, doing nothing when it is unknown """
+        with self.lock, self.connection as connection:
+            connection.execute(
+                "DELETE FROM revoked_tokens WHERE token_id = ?", (token_id,))
+
+    def __iter__(self):
+        """ Iterates over the revoked token ids """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT token_id FROM revoked_tokens").fetchall()
+        return (row[0] for row in rows)
+
+    def __len__(self) -> int:
+        """ Returns the number of revoked tokens """
+        with self.lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM revoked_tokens").fetchone()[0]
+
+    def purge(self, now: float = None) -> int:
+        """ Forgets the tokens expired before now, purge_batch rows per
+        transaction, and returns their count """
+        if now is None:
+            now = time.time()
+        purged = 0
+        while True:
+            with self.lock, self.connection as connection:
+                deleted = connection.execute(
+                    "DELETE FROM revoked_tokens WHERE token_id IN ("
+                    "SELECT token_id FROM revoked_tokens "
+                    "WHERE expires_at < ? LIMIT ?)",
+                    (now, self.purge_batch)).rowcount
+            purged += deleted
+            if deleted < self.purge_batch:
+                return purged
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Stateless session token authentication
+"""
+from os import getenv
+from typing import Dict
+from api.v1.auth.session_auth import SessionAuth
+from api.v1.auth.session_store import SQLiteRevokedTokens
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+def b64_encode(data: bytes) -> str:
+    """ Unpadded URL-safe base64 """
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def b64_decode(text: str) -> bytes:
+    """ Decode unpadded URL-safe base64 """
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def load_keys(pairs: str) -> Dict[str, bytes]:
+    """ Parses "<key id>:<secret>" pairs separated by commas """
+    keys = {}
+    for pair in pairs.split(","):
+        key_id, _, secret = pair.strip().partition(":")
+        if key_id and secret:
+            keys.setdefault(key_id, secret.encode("utf-8"))
+    return keys
+
+
+class SessionTokenAuth(SessionAuth):
+    """ SessionTokenAuth class
+
+    The session cookie holds <key id>.<payload>.<signature>: the payload
+    carries the user id, the expiration time and a token id, and is
+    signed with HMAC-SHA256, so verifying it needs no store access.
+    SESSION_TOKEN_KEYS lists "<key id>:<secret>" pairs separated by
+    commas; the first one signs new tokens, the others only verify, so
+    keys can be rotated without logging users out. It is required, a
+    key of one process would not verify in the others. Tokens always
+    expire, SESSION_DURATION seconds after their creation or a day when
+    it is not set. Logging out needs SESSION_TOKEN_REVOCATION: revoked
+    token ids are kept until the token expires, in the SQLite file of
+    the session store when SESSION_STORE is sqlite so that every worker
+    sees them, in this process only otherwise. Keys and in-process
+    revoked ids are class attributes, shared by every instance like
+    user_id_by_session_id.
+    """
+    keys: Dict[str, bytes] = load_keys(getenv("SESSION_TOKEN_KEYS", ""))
+    signing_key_id = next(iter(keys), None)
+    revoked: Dict[str, int] = {}
+    revoked_lock = threading.Lock()
+    next_prune = 0.0
+
+    def __init__(self) -> None:
+        """ Load the session duration and the revocation store, refuse
+        to start without keys """
+        if len(self.keys) == 0:
+            raise ValueError("SESSION_TOKEN_KEYS must list at least one "
+                             "<key id>:<secret> pair")
+        try:
+            self.session_duration = int(getenv("SESSION_DURATION"))
+        except Exception:
+            self.session_duration = 0
+        if self.session_duration <= 0:
+            self.session_duration = 24 * 3600
+        self.revocation = getenv("SESSION_TOKEN_REVOCATION") is not None
+        if self.revocation and getenv("SESSION_STORE") == "sqlite":
+            self.revoked = SQLiteRevokedTokens(
+                getenv("SESSION_STORE_PATH", ".db_sessions.sqlite"))
+        elif self.revocation:
+            logger.warning("Revoked session tokens are not shared between "
+                           "processes, set SESSION_STORE=sqlite")
+
+    @property
+    def session_counters(self) -> dict:
+        """ Returns the revoked token count """
+        return {"revoked": len(self.revoked)}
+
+    def _signature(self, key_id: str, payload: str) -> bytes:
+        """ Returns the MAC of key_id.payload """
+        message = "{}.{}".format(key_id, payload).encode("ascii")
+        return hmac.new(self.keys[key_id], message, hashlib.sha256).digest()
+
+    def create_session(self, user_id: str = None) -> str:
+        """ Returns a signed token for user_id """
+        if user_id is None or not isinstance(user_id, str):
+            return None
+        expires = int(time.time()) + self.session_duration
+        payload = b64_encode(json.dumps(
+            [user_id, expires, b64_encode(secrets.token_bytes(8))],
+            separators=(",", ":")).encode("utf-8"))
+        key_id = self.signing_key_id
+        return "{}.{}.{}".format(
+            key_id, payload, b64_encode(self._signature(key_id, payload)))
+
+    def verify_token(self, token: str = None) -> list:
+        """ Returns the [user_id, expires, token_id] payload of a valid,
+        unexpired and unrevoked token, None otherwise """
+        if token is None or not isinstance(token, str):
+            return None
+        parts = token.split(".")
+        if len(parts) != 3 or parts[0] not in self.keys:
+            return None
+        key_id, payload, signature = parts
+        try:
+            valid = hmac.compare_digest(
+                b64_decode(signature), self._signature(key_id, payload))
+            if not valid:
+                return None
+            user_id, expires, token_id = json.loads(b64_decode(payload))
+        except (ValueError, TypeError, UnicodeError):
+            return None
+        if not isinstance(expires, int) or expires < time.time():
+            return None
+        if token_id in self.revoked:
+            return None
+        return [user_id, expires, token_id]
+
+    def user_id_for_session_id(self, session_id: str = None) -> str:
+        """ Returns the user id of a valid token """
+        payload = self.verify_token(session_id)
+        if payload is None:
+            return None
+        return payload[0]
+
+    def revoke(self, token_id: str, expires: int) -> None:
+        """ Revokes a token id until it expires, dropping the entries
+        of expired tokens at most once a minute """
+        now = time.time()
+        with self.revoked_lock:
+            self.revoked[token_id] = expires
+            if now < self.next_prune:
+                return
+            type(self).next_prune = now + 60
+            if hasattr(self.revoked, "purge"):
+                self.revoked.purge(now)
+                return
+            for revoked_id in [revoked_id for revoked_id, revoked_expires
+                               in self.revoked.items()
+                               if revoked_expires < now]:
+                del self.revoked[revoked_id]
+
+    def destroy_session(self, request=None):
+        """ Revokes the token of the request cookie, fails when
+        revocation is not enabled since the token would stay valid """
+        if not self.revocation:
+            return False
+        payload = self.verify_token(self.session_cookie(request))
+        if payload is None:
+            return False
+        self.revoke(payload[2], payload[1])
+        return True
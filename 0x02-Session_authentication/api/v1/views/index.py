@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """ Module of Index views
 """
-from flask import jsonify, abort
+from flask import jsonify, abort, current_app
 from api.v1.views import app_views
 
 
@@ -21,8 +21,15 @@ def stats() -> str:
       - the number of each objects
     """
     from models.user import User
+    from api.v1.views.session_auth import login_throttle
+    auth = current_app.extensions.get('auth')
     stats = {}
     stats['users'] = User.count()
+    if hasattr(auth, 'cache_stats'):
+        stats['basic_auth_cache'] = auth.cache_stats()
+    if hasattr(auth, 'session_counters'):
+        stats['sessions'] = auth.session_counters
+    stats['login_throttle'] = login_throttle.stats()
     return jsonify(stats)
 
 
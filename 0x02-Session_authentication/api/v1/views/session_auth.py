@@ -2,11 +2,15 @@
 """
 Session authentication route handlers
 """
+from api.v1.auth.throttle import LoginThrottle
 from api.v1.views import app_views
 from werkzeug import exceptions
-from flask import jsonify, request
+from flask import current_app, jsonify, request
 from models.user import User
 from os import abort, environ, getenv
+import math
+
+login_throttle = LoginThrottle()
 
 
 @app_views.route("/auth_session/login", methods=["POST"], strict_slashes=False)
@@ -22,6 +26,12 @@ def session_login() -> str:
     if not user_password or user_password == "":
         return jsonify({"error": "password missing"}), 400
 
+    wait = login_throttle.acquire(user_email, request.remote_addr)
+    if wait > 0:
+        response = jsonify({"error": "too many login attempts"})
+        response.headers["Retry-After"] = str(math.ceil(wait))
+        return response, 429
+
     is_valid_user = User.search({"email": user_email})
 
     if not is_valid_user:
@@ -32,7 +42,7 @@ def session_login() -> str:
     if not is_valid_user.is_valid_password(user_password):
         return jsonify({"error": "wrong password"}), 401
 
-    from api.v1.app import auth
+    auth = current_app.extensions.get("auth")
 
     session_id = auth.create_session(is_valid_user.id)
     cookie_response = getenv("SESSION_NAME")
@@ -47,7 +57,7 @@ def session_logout() -> str:
     """DELETE /api/v1/auth/session/logout - Returns deleted json (if correctly done).
     404 if fails.
     """
-    from api.v1.app import auth
+    auth = current_app.extensions.get("auth")
 
     if auth.destroy_session(request):
         return jsonify({}), 200
@@ -3,17 +3,66 @@
 Module that contains the views to manage users
 """
 from api.v1.views import app_views
+from models.base import time_date_fromat
 from models.user import User
-from flask import abort, jsonify, request
+from datetime import datetime
+from flask import abort, jsonify, request, Response
+import json
+
+
+def stream_users(users) -> str:
+    """
+    Yield a JSON array of users, one user at a time
+    """
+    yield "["
+    for i, user in enumerate(users):
+        if i > 0:
+            yield ","
+        yield json.dumps(user.to_json())
+    yield "]\n"
 
 
 @app_views.route("/users", methods=["GET"], strict_slashes=False)
 def get_all_users() -> str:
     """
     Get all users
+
+    With a limit (and a cursor), return one page of users, the cursor
+    of the next page is set in the X-Next-Cursor header
+
+    With updated_since, return the users updated since then and the ids
+    of the users removed since then, "until" is the updated_since value
+    of the next call
     """
-    users = [user.to_json() for user in User.all()]
-    return jsonify(users)
+    updated_since = request.args.get("updated_since")
+    if updated_since is not None:
+        try:
+            datetime.strptime(updated_since, time_date_fromat)
+        except ValueError:
+            return jsonify({"error": "Invalid updated_since"}), 400
+        try:
+            users, removed, until = User.changed_since(updated_since)
+        except ValueError as error:
+            return jsonify({"error": str(error)}), 410
+        return jsonify({"users": [user.to_json() for user in users],
+                        "removed": removed, "until": until})
+    limit = request.args.get("limit")
+    cursor = request.args.get("cursor")
+    if limit is None and cursor is None:
+        return Response(stream_users(User.iterate()),
+                        mimetype="application/json")
+    try:
+        limit = int(limit) if limit is not None else 100
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    try:
+        users, next_cursor = User.page(limit=limit, cursor=cursor)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+    response = Response(stream_users(users), mimetype="application/json")
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
 
 @app_views.route("/users/<user_id>", methods=["GET"], strict_slashes=False)
@@ -77,6 +126,81 @@ def create_user() -> str:
     return jsonify({"error": error_msg}), 400
 
 
+@app_views.route("/users/batch", methods=["POST"], strict_slashes=False)
+def create_users() -> str:
+    """
+    Create a list of users, saved in one write
+
+    Return one result per item: the created user or its error
+    """
+    try:
+        json_req = request.get_json()
+    except Exception:
+        json_req = None
+    if not isinstance(json_req, list):
+        return jsonify({"error": "Wrong format"}), 400
+    results = []
+    users = []
+    for item in json_req:
+        error_msg = None
+        if not isinstance(item, dict) or item.get("email", "") == "":
+            error_msg = "email missing"
+        elif item.get("password", "") == "":
+            error_msg = "password missing"
+        if error_msg is not None:
+            results.append({"error": error_msg})
+            continue
+        try:
+            user = User()
+            user.email = item.get("email")
+            user.password = item.get("password")
+            user.first_name = item.get("first_name")
+            user.last_name = item.get("last_name")
+        except Exception as error:
+            results.append({"error": f"Can't create User: {error}"})
+            continue
+        users.append(user)
+        results.append(user)
+    try:
+        User.save_many(users)
+    except Exception as error:
+        return jsonify({"error": f"Can't create Users: {error}"}), 400
+    results = [result.to_json() if isinstance(result, User) else result
+               for result in results]
+    return jsonify(results), 201 if len(users) > 0 else 400
+
+
+@app_views.route("/users/batch", methods=["DELETE"], strict_slashes=False)
+def delete_users() -> str:
+    """
+    Delete a list of users by id, removed in one write
+
+    Return one result per id: {} or its error, a repeated id is
+    removed once and reported as not found after its first occurrence
+    """
+    try:
+        json_req = request.get_json()
+    except Exception:
+        json_req = None
+    if not isinstance(json_req, list):
+        return jsonify({"error": "Wrong format"}), 400
+    results = []
+    users = []
+    seen = set()
+    for user_id in json_req:
+        user = None
+        if isinstance(user_id, str) and user_id not in seen:
+            seen.add(user_id)
+            user = User.get(user_id)
+        if user is None:
+            results.append({"error": "Not found"})
+            continue
+        users.append(user)
+        results.append({})
+    User.remove_many(users)
+    return jsonify(results), 200
+
+
 @app_views.route("/users/<user_id>", methods=["PUT"], strict_slashes=False)
 def update_user(user_id: str = None) -> str:
     """
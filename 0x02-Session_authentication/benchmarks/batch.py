@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+""" Batch write benchmark
+
+    Compare creating users one save() at a time with one save_many()
+    call, for each persistence mode. Run from the project root:
+
+        python3 -m benchmarks.batch [count]
+"""
+from models.user import User
+import models.base
+import os
+import sys
+import tempfile
+import time
+
+
+def build(count: int) -> list:
+    """ Return count new users with a hashed password
+    """
+    users = []
+    for i in range(count):
+        user = User(email="user{}@example.com".format(i))
+        user.password = "pwd{}".format(i)
+        users.append(user)
+    return users
+
+
+def single(count: int) -> float:
+    """ Return the users created per second with save()
+    """
+    User.load_from_file()
+    start = time.perf_counter()
+    for user in build(count):
+        user.save()
+    User.flush()
+    return count / (time.perf_counter() - start)
+
+
+def batch(count: int) -> float:
+    """ Return the users created per second with save_many()
+    """
+    User.load_from_file()
+    start = time.perf_counter()
+    User.save_many(build(count))
+    User.flush()
+    return count / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for mode in ("file", "journal", "group"):
+        os.chdir(tempfile.mkdtemp())
+        models.base.persistence_mode = mode
+        single_rate = single(count)
+        os.chdir(tempfile.mkdtemp())
+        batch_rate = batch(count)
+        print("{:<8} save() {:>10.0f} users/s  save_many() {:>10.0f} users/s"
+              "  x{:.1f}".format(mode, single_rate, batch_rate,
+                                 batch_rate / single_rate))
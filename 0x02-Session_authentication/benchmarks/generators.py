@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+""" Synthetic data generators for the benchmarks
+"""
+from models.base import dict_data
+from models.user import User
+from models.user_session import UserSession
+from typing import List
+import random
+
+
+def make_users(count: int, seed: int = 0) -> List[User]:
+    """ Return count users with unique emails and hashed passwords
+    """
+    rand = random.Random(seed)
+    users = []
+    for i in range(count):
+        user = User(email="user{}@example.com".format(i),
+                    first_name="First{}".format(rand.randrange(1000)),
+                    last_name="Last{}".format(rand.randrange(1000)))
+        user.password = "pwd{}".format(i)
+        users.append(user)
+    return users
+
+
+def make_sessions(count: int, users: List[User],
+                  seed: int = 0) -> List[UserSession]:
+    """ Return count sessions spread over users
+    """
+    rand = random.Random(seed)
+    return [UserSession(user_id=rand.choice(users).id,
+                        session_id="session-{}".format(i))
+            for i in range(count)]
+
+
+def fill(cls, objs: list) -> None:
+    """ Put objs in the store of cls without writing to storage
+    """
+    cls.load_from_file()
+    for obj in objs:
+        dict_data[cls.__name__][obj.id] = obj
+        obj._index_add()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+""" Memory benchmark of the model layout
+
+    Compare the slotted User/UserSession records with the previous
+    __dict__ based layout. Run from the project root:
+
+        python3 -m benchmarks.memory [count]
+"""
+from datetime import datetime
+from models.user import User
+from models.user_session import UserSession
+import sys
+import tracemalloc
+import uuid
+
+
+class DictUser():
+    """ User record with a per-instance __dict__
+    """
+
+    def __init__(self, **kwargs: dict) -> None:
+        """ Initialize a DictUser instance
+        """
+        self.id = str(uuid.uuid4())
+        self.created_at = datetime.utcnow()
+        self.updated_at = datetime.utcnow()
+        self.email = kwargs.get("email")
+        self._password = kwargs.get("_password")
+        self.first_name = kwargs.get("first_name")
+        self.last_name = kwargs.get("last_name")
+
+
+class DictUserSession():
+    """ UserSession record with a per-instance __dict__
+    """
+
+    def __init__(self, **kwargs: dict) -> None:
+        """ Initialize a DictUserSession instance
+        """
+        self.id = str(uuid.uuid4())
+        self.created_at = datetime.utcnow()
+        self.updated_at = datetime.utcnow()
+        self.user_id = kwargs.get("user_id")
+        self.session_id = kwargs.get("session_id")
+
+
+def measure(build, count: int) -> int:
+    """ Return the bytes allocated to build count objects
+    """
+    tracemalloc.start()
+    objs = [build(i) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objs
+    return size
+
+
+def user_kwargs(i: int) -> dict:
+    """ Synthetic user attributes
+    """
+    return {"email": "user{}@example.com".format(i),
+            "_password": "{:064x}".format(i),
+            "first_name": "First{}".format(i),
+            "last_name": "Last{}".format(i)}
+
+
+def session_kwargs(i: int) -> dict:
+    """ Synthetic session attributes, 10 sessions per user
+    """
+    return {"user_id": "user-{}".format(i // 10),
+            "session_id": str(uuid.uuid4())}
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    cases = [
+        ("User (__dict__)", lambda i: DictUser(**user_kwargs(i))),
+        ("User (slots)", lambda i: User(**user_kwargs(i))),
+        ("UserSession (__dict__)",
+         lambda i: DictUserSession(**session_kwargs(i))),
+        ("UserSession (slots)",
+         lambda i: UserSession(**session_kwargs(i))),
+    ]
+    for name, build in cases:
+        size = measure(build, count)
+        print("{:<24} {:>8} objects {:>10.1f} MiB {:>6} bytes/object".format(
+            name, count, size / (1024 * 1024), size // count))
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+""" Session lookup benchmark
+
+    Resolve random session ids with every session auth type, the
+    lookup-based ones against a store of sessions sessions. Run from
+    the project root:
+
+        python3 -m benchmarks.sessions [sessions] [lookups]
+
+    SESSION_STORE=sqlite measures the lookup-based types on the shared
+    SQLite session store.
+"""
+from api.v1.auth.session_auth import SessionAuth
+from api.v1.auth.session_db_auth import SessionDBAuth
+from api.v1.auth.session_exp_auth import SessionExpAuth
+from api.v1.auth.session_token_auth import SessionTokenAuth
+import models.base
+import os
+import random
+import sys
+import tempfile
+import time
+
+
+def run(auth, count: int, lookups: int) -> float:
+    """ Return the lookups per second of auth over count sessions
+    """
+    session_ids = [auth.create_session("user{}".format(i))
+                   for i in range(count)]
+    rand = random.Random(1)
+    start = time.perf_counter()
+    for _ in range(lookups):
+        assert auth.user_id_for_session_id(rand.choice(session_ids))
+    return lookups / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    os.chdir(tempfile.mkdtemp())
+    os.environ.setdefault("SESSION_DURATION", "3600")
+    os.environ.setdefault("SESSION_TOKEN_REVOCATION", "1")
+    models.base.persistence_mode = "group"
+    for auth_class in (SessionAuth, SessionExpAuth, SessionDBAuth,
+                       SessionTokenAuth):
+        print("{:<18} {:>12.0f} lookups/s".format(
+            auth_class.__name__, run(auth_class(), count, lookups)))
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+""" Storage backend benchmark
+
+    Compare load time, save latency and file size of the json, binary
+    and sqlite backends. Run from the project root:
+
+        python3 -m benchmarks.storage [count ...]
+"""
+from models.base import dict_data
+from models.storage import get_storage
+from models.user import User
+import models.base
+import os
+import sys
+import tempfile
+import time
+
+
+def populate(count: int) -> None:
+    """ Fill the User store without touching the file
+    """
+    User.load_from_file()
+    for i in range(count):
+        user = User(email="user{}@example.com".format(i),
+                    first_name="First{}".format(i),
+                    last_name="Last{}".format(i))
+        user.password = "pwd{}".format(i)
+        dict_data["User"][user.id] = user
+        user._index_add()
+
+
+def bench(name: str, count: int) -> dict:
+    """ Return the measures of one backend for count users
+    """
+    storage = get_storage(name)
+    models.base.storage = storage
+    populate(count)
+
+    start = time.perf_counter()
+    User.save_to_file()
+    snapshot = time.perf_counter() - start
+    size = sum(os.path.getsize(f) for f in os.listdir(".")
+               if f.startswith(storage.path("User")))
+
+    start = time.perf_counter()
+    User.load_from_file()
+    load = time.perf_counter() - start
+
+    user = User.search({"email": "user{}@example.com".format(count // 2)})[0]
+    latencies = []
+    for i in range(20):
+        user.first_name = "Changed{}".format(i)
+        start = time.perf_counter()
+        user.save()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {"backend": name, "count": count, "snapshot": snapshot,
+            "load": load, "save": latencies[len(latencies) // 2],
+            "size": size}
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    os.chdir(tempfile.mkdtemp())
+    print("{:<8} {:>8} {:>12} {:>10} {:>12} {:>10}".format(
+        "backend", "users", "snapshot s", "load s", "save ms", "size MiB"))
+    for count in counts:
+        for name in ("json", "binary", "sqlite"):
+            try:
+                result = bench(name, count)
+            except ImportError as error:
+                print("{:<8} skipped: {}".format(name, error))
+                continue
+            print("{backend:<8} {count:>8} {snapshot:>12.3f} {load:>10.3f} "
+                  "{save_ms:>12.3f} {size_mib:>10.1f}".format(
+                      save_ms=result["save"] * 1000,
+                      size_mib=result["size"] / (1024 * 1024), **result))
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+""" Model-layer benchmark suite
+
+    Measure ops/sec, p50/p99 latency and peak RSS of the Base
+    operations on synthetic stores. Every (operation, size) case runs
+    in its own process so that peak RSS is not shared between cases,
+    and the peak is reset once the store is built (Linux only) so that
+    it covers the timed operation only.
+    Run from the project root:
+
+        python3 -m benchmarks.suite [--sizes 1000,10000] [--ops 1000]
+                                    [--output results.json]
+        python3 -m benchmarks.suite --compare old.json new.json
+
+    BASE_* environment variables (persistence mode, storage...) apply
+    to the measured operations and are recorded in the results.
+"""
+from models.user import User
+from models.user_session import UserSession
+from benchmarks.generators import fill, make_sessions, make_users
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+operations = ["save", "get", "search", "search_scan", "session_search",
+              "to_json", "load_from_file"]
+
+
+def timed(fn, ops: int, budget: float = 10.0) -> list:
+    """ Return the latencies of up to ops calls of fn, stopping once
+        budget seconds are spent
+    """
+    latencies = []
+    deadline = time.perf_counter() + budget
+    for i in range(ops):
+        start = time.perf_counter()
+        fn(i)
+        end = time.perf_counter()
+        latencies.append(end - start)
+        if end > deadline:
+            break
+    return latencies
+
+
+def rss_kb(field: str) -> int:
+    """ Return the VmRSS or VmHWM line of /proc/self/status in KiB,
+        None when it is not available
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss() -> bool:
+    """ Reset the peak RSS of the process to its current RSS,
+        return False when the kernel does not support it
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def run_case(operation: str, count: int, ops: int) -> dict:
+    """ Build a store of count users and measure one operation
+    """
+    os.chdir(tempfile.mkdtemp())
+    rand = random.Random(1)
+    users = make_users(count)
+    fill(User, users)
+    if operation == "session_search":
+        sessions = make_sessions(count, users)
+        fill(UserSession, sessions)
+        fn = (lambda i: UserSession.search(
+            {"session_id": rand.choice(sessions).session_id}))
+    elif operation == "save":
+        fn = (lambda i: rand.choice(users).save())
+    elif operation == "get":
+        fn = (lambda i: User.get(rand.choice(users).id))
+    elif operation == "search":
+        fn = (lambda i: User.search({"email": rand.choice(users).email}))
+    elif operation == "search_scan":
+        fn = (lambda i: User.search(
+            {"first_name": "First{}".format(rand.randrange(1000))}))
+    elif operation == "to_json":
+        fn = (lambda i: rand.choice(users).to_json(True))
+    elif operation == "load_from_file":
+        User.save_to_file()
+        fn = (lambda i: User.load_from_file())
+    else:
+        raise ValueError("Unknown operation {}".format(operation))
+
+    start_rss = rss_kb("VmRSS")
+    if reset_peak_rss():
+        latencies = sorted(timed(fn, ops))
+        peak_rss = rss_kb("VmHWM")
+    else:
+        start_rss = None
+        latencies = sorted(timed(fn, ops))
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    total = sum(latencies)
+    return {
+        "operation": operation,
+        "count": count,
+        "ops": len(latencies),
+        "ops_per_sec": len(latencies) / total if total > 0 else None,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1,
+                                int(len(latencies) * 0.99))] * 1000,
+        "peak_rss_kb": peak_rss,
+        "rss_growth_kb": (peak_rss - start_rss
+                          if start_rss is not None else None),
+    }
+
+
+def git_commit() -> str:
+    """ Return the current commit, None outside of a git checkout
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"],
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_suite(sizes: list, ops: int, selected: list) -> dict:
+    """ Run every case in a child process and collect the results
+    """
+    results = []
+    for count in sizes:
+        for operation in selected:
+            child = subprocess.run(
+                [sys.executable, "-m", "benchmarks.suite", "--case",
+                 operation, "--sizes", str(count), "--ops", str(ops)],
+                capture_output=True, text=True, cwd=os.getcwd())
+            if child.returncode != 0:
+                print(child.stderr, file=sys.stderr)
+                continue
+            result = json.loads(child.stdout)
+            print("{operation:<16} {count:>8} {ops:>6} ops "
+                  "{ops_per_sec:>12.1f} ops/s p50 {p50_ms:>9.3f} ms "
+                  "p99 {p99_ms:>9.3f} ms rss {peak_rss_kb:>9} KiB"
+                  .format(**result), file=sys.stderr)
+            results.append(result)
+    return {
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "env": {k: v for k, v in os.environ.items() if k.startswith("BASE_")},
+        "results": results,
+    }
+
+
+def compare(old_path: str, new_path: str) -> None:
+    """ Print the ops/sec and p99 ratio of new results over old ones
+    """
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    old_results = {(r["operation"], r["count"]): r for r in old["results"]}
+    print("{:<16} {:>8} {:>10} {:>10}".format(
+        "operation", "users", "ops/s x", "p99 x"))
+    for result in new["results"]:
+        key = (result["operation"], result["count"])
+        before = old_results.get(key)
+        if before is None:
+            continue
+        print("{:<16} {:>8} {:>10.2f} {:>10.2f}".format(
+            key[0], key[1], result["ops_per_sec"] / before["ops_per_sec"],
+            result["p99_ms"] / before["p99_ms"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    parser.add_argument("--ops", type=int, default=1000)
+    parser.add_argument("--operations", default=",".join(operations))
+    parser.add_argument("--output")
+    parser.add_argument("--case")
+    parser.add_argument("--compare", nargs=2)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    elif args.case:
+        print(json.dumps(run_case(args.case, int(args.sizes), args.ops)))
+    else:
+        suite = run_suite([int(size) for size in args.sizes.split(",")],
+                          args.ops, args.operations.split(","))
+        output = json.dumps(suite, indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(output)
+        else:
+            print(output)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+""" Multi-threaded stress benchmark of the Base store
+
+    Reader threads run User.search() by email and User.all() while a
+    writer thread keeps saving and removing users. Run from the
+    project root:
+
+        python3 -m benchmarks.threads [users] [seconds]
+"""
+from models.base import dict_data
+from models.user import User
+import models.base
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+
+def populate(count: int) -> None:
+    """ Fill the User store without touching the file
+    """
+    User.load_from_file()
+    for i in range(count):
+        user = User(email="user{}@example.com".format(i))
+        dict_data["User"][user.id] = user
+        user._index_add()
+
+
+def reader(count: int, stop: threading.Event, results: list) -> None:
+    """ Search random users until stopped
+    """
+    done = 0
+    while not stop.is_set():
+        email = "user{}@example.com".format(random.randrange(count))
+        User.search({"email": email})
+        done += 1
+        if done % 1000 == 0:
+            assert len(User.all()) >= count
+    results.append(done)
+
+
+def writer(stop: threading.Event) -> None:
+    """ Save and remove users until stopped
+    """
+    while not stop.is_set():
+        user = User(email="writer@example.com")
+        user.save()
+        user.remove()
+
+
+def run(threads: int, count: int, seconds: float) -> float:
+    """ Return the searches per second of threads readers
+    """
+    stop = threading.Event()
+    results = []
+    workers = [threading.Thread(target=reader, args=(count, stop, results))
+               for _ in range(threads)]
+    workers.append(threading.Thread(target=writer, args=(stop,)))
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    return sum(results) / seconds
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    os.chdir(tempfile.mkdtemp())
+    models.base.persistence_mode = "group"
+    populate(count)
+    for threads in (1, 2, 4, 8):
+        print("{:>2} reader threads {:>12.0f} searches/s".format(
+            threads, run(threads, count, seconds)))
@@ -3,15 +3,53 @@
 
     Base class, including basic operations
 """
-from datetime import datetime
-from typing import TypeVar, List, Iterable
-from os import path
+from collections import deque
+from datetime import datetime, timedelta
+from typing import TypeVar, List, Iterable, Tuple
+from os import getenv, path
+from models.columnar import ColumnStore
+from models.storage import get_storage
+import atexit
+import base64
+import bisect
+import contextlib
+import fcntl
 import json
+import logging
+import os
+import threading
+import time
 import uuid
 
 
 dict_data = {}
+dict_index = {}
+dict_columns = {}
+dict_order = {}
+dict_updated = {}
+dict_tombstones = {}
+dict_serialized = {}
+dict_journal = {}
+dict_sync = {}
+dict_pending = {}
+dict_locks = {}
+dict_file_locks = {}
+locks_lock = threading.Lock()
 time_date_fromat = "%Y-%m-%dT%H:%M:%S"
+persistence_mode = getenv("BASE_PERSISTENCE", "file")
+journal_max_size = int(getenv("BASE_JOURNAL_MAX_SIZE", 1024 * 1024))
+storage = get_storage()
+search_mode = getenv("BASE_SEARCH", "index")
+sync_interval = getenv("BASE_SYNC_INTERVAL")
+tombstone_max = max(0, int(getenv("BASE_TOMBSTONE_MAX", 10000)))
+page_max_limit = int(getenv("BASE_PAGE_MAX_LIMIT", 1000))
+flush_interval = float(getenv("BASE_FLUSH_INTERVAL", 1.0))
+flush_max_dirty = int(getenv("BASE_FLUSH_MAX_DIRTY", 100))
+dict_dirty = {}
+flush_condition = threading.Condition()
+flush_lock = threading.Lock()
+flush_thread = None
+logger = logging.getLogger(__name__)
 
 
 class Base():
@@ -19,6 +57,8 @@ class Base():
 
         Initialize a Base instance
     """
+    __slots__ = ('id', 'created_at', 'updated_at')
+    indexed_attributes: List[str] = []
 
     def __init__(self, *args: list, **kwargs: dict) -> None:
         """ Initialize a Base instance
@@ -39,6 +79,14 @@ class Base():
         else:
             self.updated_at = datetime.utcnow()
 
+    def __setattr__(self, name: str, value) -> None:
+        """ Set an attribute and drop the cached serialized form
+        """
+        object.__setattr__(self, name, value)
+        cache = dict_serialized.get(self.__class__.__name__)
+        if cache is not None:
+            cache.pop(getattr(self, 'id', None), None)
+
     def __eq__(self, other: TypeVar('Base')) -> bool:
         """ Check equality
         """
@@ -48,11 +96,35 @@ class Base():
             return False
         return (self.id == other.id)
 
+    @classmethod
+    def _attribute_names(cls) -> List[str]:
+        """ Return the slot names of the class, base classes first
+        """
+        names = cls.__dict__.get('_slot_names')
+        if names is None:
+            names = []
+            for klass in reversed(cls.__mro__):
+                for name in klass.__dict__.get('__slots__', ()):
+                    if name not in names and name != '__dict__':
+                        names.append(name)
+            cls._slot_names = names
+        return names
+
+    def _attributes(self) -> Iterable[tuple]:
+        """ Yield (name, value) of every attribute set on the object
+        """
+        for key in self.__class__._attribute_names():
+            try:
+                yield key, getattr(self, key)
+            except AttributeError:
+                continue
+        yield from getattr(self, '__dict__', {}).items()
+
     def to_json(self, for_serialization: bool = False) -> dict:
         """ Convert the object to a JSON dictionary
         """
         result = {}
-        for key, value in self.__dict__.items():
+        for key, value in self._attributes():
             if not for_serialization and key[0] == '_':
                 continue
             if type(value) is datetime:
@@ -61,54 +133,537 @@ class Base():
                 result[key] = value
         return result
 
+    @classmethod
+    def _lock(cls) -> threading.RLock:
+        """ Return the write lock of the class store
+        """
+        lock = dict_locks.get(cls.__name__)
+        if lock is None:
+            with locks_lock:
+                lock = dict_locks.setdefault(cls.__name__, threading.RLock())
+        return lock
+
+    @classmethod
+    @contextlib.contextmanager
+    def _file_lock(cls):
+        """ Hold the lock of the class files, an exclusive flock on
+            .db_<Class>.lock shared with the other processes
+
+            Reentrant, and always taken before the class lock
+        """
+        instance_class = cls.__name__
+        with locks_lock:
+            held = dict_file_locks.setdefault(
+                instance_class,
+                {'lock': threading.RLock(), 'fd': None, 'depth': 0})
+        with held['lock']:
+            if held['depth'] == 0:
+                held['fd'] = os.open(".db_{}.lock".format(instance_class),
+                                     os.O_RDWR | os.O_CREAT)
+                fcntl.flock(held['fd'], fcntl.LOCK_EX)
+            held['depth'] += 1
+            try:
+                yield
+            finally:
+                held['depth'] -= 1
+                if held['depth'] == 0:
+                    os.close(held['fd'])
+                    held['fd'] = None
+
+    @classmethod
+    def _index_new(cls) -> dict:
+        """ Return empty secondary indexes for the class
+        """
+        return {
+            'values': {},
+            'attrs': {attr: {} for attr in cls.indexed_attributes}
+        }
+
+    @classmethod
+    def _index_init(cls) -> None:
+        """ Reset the secondary indexes of the class
+        """
+        dict_index[cls.__name__] = cls._index_new()
+
+    @classmethod
+    def _index_set(cls, obj_id: str, obj_json: dict,
+                   index: dict = None) -> None:
+        """ Index one object from its attribute values
+        """
+        instance_class = cls.__name__
+        if index is None:
+            if instance_class not in dict_index:
+                cls._index_init()
+            index = dict_index[instance_class]
+        cls._index_unset(obj_id, index)
+        values = {}
+        for attr, entries in index['attrs'].items():
+            value = obj_json.get(attr)
+            try:
+                entries.setdefault(value, set()).add(obj_id)
+            except TypeError:
+                continue
+            values[attr] = value
+        index['values'][obj_id] = values
+
+    @classmethod
+    def _index_unset(cls, obj_id: str, index: dict = None) -> None:
+        """ Remove one object from the secondary indexes
+        """
+        if index is None:
+            index = dict_index.get(cls.__name__)
+        if index is None:
+            return
+        values = index['values'].pop(obj_id, None)
+        if values is None:
+            return
+        for attr, value in values.items():
+            ids = index['attrs'][attr].get(value)
+            if ids is None:
+                continue
+            ids.discard(obj_id)
+            if len(ids) == 0:
+                del index['attrs'][attr][value]
+
+    def _index_add(self) -> None:
+        """ Add current object to the secondary indexes
+        """
+        values = {attr: getattr(self, attr, None)
+                  for attr in self.__class__.indexed_attributes}
+        self.__class__._index_set(self.id, values)
+
+    def _index_remove(self) -> None:
+        """ Remove current object from the secondary indexes
+        """
+        self.__class__._index_unset(self.id)
+
+    @classmethod
+    def _record_values(cls, obj_id: str) -> dict:
+        """ Return the attribute values of one object without building it
+        """
+        obj = dict_data[cls.__name__][obj_id]
+        if not _is_record(obj):
+            return dict(obj._attributes())
+        values = dict(_record(obj))
+        for key in ('created_at', 'updated_at'):
+            if values.get(key) is not None:
+                values[key] = datetime.strptime(values[key], time_date_fromat)
+        return values
+
+    @classmethod
+    def _column_store(cls) -> ColumnStore:
+        """ Return the column store of the class, built on first use
+        """
+        instance_class = cls.__name__
+        store = dict_columns.get(instance_class)
+        if store is None:
+            with cls._lock():
+                store = dict_columns.get(instance_class)
+                if store is None:
+                    store = ColumnStore(cls._attribute_names())
+                    for obj_id in list(dict_data[instance_class]):
+                        store.put(obj_id, cls._record_values(obj_id))
+                    dict_columns[instance_class] = store
+        return store
+
+    @classmethod
+    def _hydrate(cls, obj_id: str) -> TypeVar('Base'):
+        """ Return the object of obj_id, building it from its
+            raw record the first time it is accessed
+        """
+        instance_class = cls.__name__
+        objs = dict_data[instance_class]
+        obj = objs.get(obj_id)
+        if _is_record(obj):
+            with cls._lock():
+                objs = dict_data[instance_class]
+                obj = objs.get(obj_id)
+                if _is_record(obj):
+                    raw = obj
+                    obj = cls(**_record(raw))
+                    objs[obj_id] = obj
+                    if isinstance(raw, str):
+                        cache = dict_serialized.setdefault(instance_class,
+                                                           {})
+                        cache[obj_id] = raw
+        return obj
+
+    def _serialized(self) -> str:
+        """ Return the JSON text of the object, re-encoded only when
+            an attribute changed since the last call
+        """
+        cache = dict_serialized.setdefault(self.__class__.__name__, {})
+        text = cache.get(self.id)
+        if text is None:
+            text = json.dumps(self.to_json(True))
+            cache[self.id] = text
+        return text
+
     @classmethod
     def load_from_file(cls):
-        """ Load all objects from file
+        """ Load all objects from file, then replay the journal
+
+            Records are parsed incrementally and kept raw, as JSON text
+            or decoded dicts depending on the storage: only ids and
+            indexed attributes are read eagerly, objects are built on
+            their first get() or search() hit
         """
         instance_class = cls.__name__
-        file_path = ".db_{}.json".format(instance_class)
-        dict_data[instance_class] = {}
-        if not path.exists(file_path):
+        journal_path = ".db_{}.journal".format(instance_class)
+        objs = {}
+        index = cls._index_new()
+        journal_size = 0
+
+        with cls._file_lock():
+            for obj_id, raw in storage.read(instance_class):
+                objs[obj_id] = raw
+                if len(cls.indexed_attributes) > 0:
+                    cls._index_set(obj_id, _record(raw), index)
+
+            if path.exists(journal_path):
+                with open(journal_path, 'rb') as f:
+                    for record in _iter_journal(f):
+                        cls._apply_record(record, objs, index)
+                    journal_size = f.tell()
+            file_state = cls._file_state(journal_size)
+
+        with cls._lock():
+            cls._apply_pending(objs, index)
+            dict_data[instance_class] = objs
+            dict_index[instance_class] = index
+            dict_journal[instance_class] = journal_size
+            dict_columns.pop(instance_class, None)
+            dict_order.pop(instance_class, None)
+            dict_updated.pop(instance_class, None)
+            dict_tombstones[instance_class] = {
+                'horizon': datetime.utcnow().strftime(time_date_fromat),
+                'entries': deque(maxlen=tombstone_max)
+            }
+            dict_serialized[instance_class] = {}
+            dict_sync[instance_class] = file_state
+
+    @classmethod
+    def _apply_record(cls, record: dict, objs: dict, index: dict) -> str:
+        """ Apply one journal record to a store and its indexes,
+            return the id of the object
+        """
+        if record.get('op') == 'remove':
+            obj_id = record.get('id')
+            objs.pop(obj_id, None)
+            cls._index_unset(obj_id, index)
+        else:
+            obj_json = record.get('obj')
+            obj_id = obj_json.get('id')
+            objs[obj_id] = json.dumps(obj_json)
+            cls._index_set(obj_id, obj_json, index)
+        return obj_id
+
+    @classmethod
+    def _apply_pending(cls, objs: dict, index: dict) -> None:
+        """ Apply the writes of this process not yet on disk to a store
+            and its indexes, so that a reload does not lose them
+        """
+        for obj_id, obj in dict_pending.get(cls.__name__, {}).items():
+            if obj is None:
+                objs.pop(obj_id, None)
+                cls._index_unset(obj_id, index)
+            else:
+                objs[obj_id] = obj
+                cls._index_set(obj_id,
+                               {attr: getattr(obj, attr, None)
+                                for attr in cls.indexed_attributes},
+                               index)
+
+    @classmethod
+    def _written(cls, saved: List[TypeVar('Base')],
+                 removed: List[str]) -> None:
+        """ Forget the pending writes persisted by saved and removed
+        """
+        with cls._lock():
+            pending = dict_pending.get(cls.__name__, {})
+            for obj in saved:
+                if pending.get(obj.id, None) is obj:
+                    del pending[obj.id]
+            for obj_id in removed:
+                if obj_id in pending and pending[obj_id] is None:
+                    del pending[obj_id]
+
+    @classmethod
+    def _file_state(cls, journal_offset: int = 0) -> dict:
+        """ Return the on-disk state of the class store
+        """
+        instance_class = cls.__name__
+        journal_path = ".db_{}.journal".format(instance_class)
+        state = {'file': storage.version(instance_class), 'journal': None,
+                 'offset': journal_offset, 'checked': time.monotonic()}
+        try:
+            state['journal'] = os.stat(journal_path).st_ino
+        except OSError:
+            pass
+        return state
+
+    @classmethod
+    def sync(cls, interval: float = None) -> None:
+        """ Apply the changes written by other processes
+
+            Runs at most once every interval seconds, BASE_SYNC_INTERVAL
+            by default: new journal records are tailed and applied,
+            a rewritten snapshot triggers a full reload
+        """
+        if interval is None:
+            if sync_interval is None:
+                return
+            interval = float(sync_interval)
+        instance_class = cls.__name__
+        known = dict_sync.get(instance_class)
+        if known is None:
             return
+        if time.monotonic() - known['checked'] < interval:
+            return
+        journal_path = ".db_{}.journal".format(instance_class)
+        with cls._file_lock(), cls._lock():
+            current = cls._file_state(known['offset'])
+            if current['file'] != known['file'] or \
+                    (known['journal'] is not None and
+                     current['journal'] != known['journal']):
+                cls.load_from_file()
+                return
+            dict_sync[instance_class] = current
+            if current['journal'] is None:
+                return
+            pending = dict_pending.get(instance_class, {})
+            with open(journal_path, 'rb') as f:
+                f.seek(known['offset'])
+                for record in _iter_journal(f):
+                    if record.get('pid') == os.getpid():
+                        continue
+                    if record.get('id', record.get('obj', {}).get('id')) \
+                            in pending:
+                        continue
+                    cls._apply_tailed(record)
+                current['offset'] = f.tell()
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                dict_data[instance_class][obj_id] = cls(**obj_json)
+    @classmethod
+    def _apply_tailed(cls, record: dict) -> None:
+        """ Apply one journal record of another process to the store
+            and to every index already built, under the class lock
+        """
+        instance_class = cls.__name__
+        objs = dict_data[instance_class]
+        obj_id = record.get('id', record.get('obj', {}).get('id'))
+        known = obj_id in objs
+        cls._apply_record(record, objs, dict_index[instance_class])
+        dict_serialized.get(instance_class, {}).pop(obj_id, None)
+        order = dict_order.get(instance_class)
+        store = dict_columns.get(instance_class)
+        if record.get('op') == 'remove':
+            cls._tombstone(obj_id)
+            if not known:
+                return
+            if order is not None:
+                position = bisect.bisect_left(order, obj_id)
+                if position < len(order) and order[position] == obj_id:
+                    del order[position]
+            if instance_class in dict_updated:
+                cls._updated_unset(obj_id)
+            if store is not None:
+                store.delete(obj_id)
+            return
+        if order is not None and not known:
+            bisect.insort(order, obj_id)
+        if instance_class in dict_updated:
+            cls._updated_set(obj_id, record['obj'].get('updated_at'))
+        if store is not None:
+            store.put(obj_id, cls._record_values(obj_id))
 
     @classmethod
     def save_to_file(cls) -> None:
-        """ Save all objects to file
+        """ Save all objects to file and truncate the journal
+
+            Under the file lock, the changes written by other processes
+            are read first, up to the end of the journal, so the
+            rewrite keeps them
         """
         instance_class = cls.__name__
-        file_path = ".db_{}.json".format(instance_class)
-        objs_json = {}
-        for obj_id, obj in dict_data[instance_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        journal_path = ".db_{}.journal".format(instance_class)
+        with cls._file_lock(), cls._lock():
+            if dict_sync.get(instance_class) is None:
+                cls.load_from_file()
+            else:
+                cls.sync(0)
+            objs = list(dict_data[instance_class].items())
+            items = [(obj_id, _encode_record(obj, storage.decoded))
+                     for obj_id, obj in objs]
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+            storage.write(instance_class, items)
+            if path.exists(journal_path):
+                os.remove(journal_path)
+            dict_pending.pop(instance_class, None)
+            dict_journal[instance_class] = 0
+            dict_sync[instance_class] = cls._file_state()
+
+    @classmethod
+    def append_to_journal(cls, *records: dict) -> None:
+        """ Append records to the journal in one write,
+            compact it once it grows over journal_max_size
+        """
+        instance_class = cls.__name__
+        journal_path = ".db_{}.journal".format(instance_class)
+        line = ""
+        for record in records:
+            record['pid'] = os.getpid()
+            line += json.dumps(record) + "\n"
+        with cls._file_lock(), cls._lock():
+            with open(journal_path, 'a') as f:
+                f.write(line)
+            known = dict_sync.get(instance_class)
+            if known is not None and known['journal'] is None:
+                known['journal'] = os.stat(journal_path).st_ino
+            size = dict_journal.get(instance_class, 0) + len(line)
+            dict_journal[instance_class] = size
+            if size > journal_max_size:
+                cls.save_to_file()
+
+    @classmethod
+    def mark_dirty(cls) -> None:
+        """ Schedule the class store for the next group commit
+        """
+        global flush_thread
+        with flush_condition:
+            entry = dict_dirty.setdefault(cls.__name__, [cls, 0])
+            entry[1] += 1
+            if flush_thread is None:
+                flush_thread = threading.Thread(target=_flush_loop,
+                                                daemon=True)
+                flush_thread.start()
+            if entry[1] >= flush_max_dirty:
+                flush_condition.notify()
+
+    @classmethod
+    def flush(cls) -> None:
+        """ Write every pending group commit to file now
+
+            A class failing to write stays scheduled for the next group
+            commit, and the first error is raised once the other
+            classes are written
+        """
+        with flush_lock:
+            with flush_condition:
+                pending = [entry[0] for entry in dict_dirty.values()]
+                dict_dirty.clear()
+            error = None
+            for dirty_cls in pending:
+                try:
+                    dirty_cls.save_to_file()
+                except Exception as exception:
+                    with flush_condition:
+                        dict_dirty.setdefault(dirty_cls.__name__,
+                                              [dirty_cls, 0])
+                    if error is None:
+                        error = exception
+            if error is not None:
+                raise error
+
+    def _store(self) -> None:
+        """ Put current object in the store and its indexes
+        """
+        instance_class = self.__class__.__name__
+        with self.__class__._lock():
+            self.updated_at = datetime.utcnow()
+            order = dict_order.get(instance_class)
+            if order is not None and self.id not in dict_data[instance_class]:
+                bisect.insort(order, self.id)
+            dict_data[instance_class][self.id] = self
+            dict_pending.setdefault(instance_class, {})[self.id] = self
+            if instance_class in dict_updated:
+                self.__class__._updated_set(
+                    self.id, self.updated_at.strftime(time_date_fromat))
+            self._index_add()
+            if instance_class in dict_columns:
+                dict_columns[instance_class].put(self.id,
+                                                 dict(self._attributes()))
+
+    def _unstore(self) -> bool:
+        """ Take current object out of the store and its indexes,
+            return False if it was not stored
+        """
+        instance_class = self.__class__.__name__
+        with self.__class__._lock():
+            if dict_data[instance_class].pop(self.id, None) is None:
+                return False
+            dict_pending.setdefault(instance_class, {})[self.id] = None
+            dict_serialized.get(instance_class, {}).pop(self.id, None)
+            self._index_remove()
+            if instance_class in dict_columns:
+                dict_columns[instance_class].delete(self.id)
+            order = dict_order.get(instance_class)
+            if order is not None:
+                position = bisect.bisect_left(order, self.id)
+                if position < len(order) and order[position] == self.id:
+                    del order[position]
+            if instance_class in dict_updated:
+                self.__class__._updated_unset(self.id)
+            self.__class__._tombstone(self.id)
+        return True
+
+    @classmethod
+    def _persist(cls, saved: List[TypeVar('Base')] = [],
+                 removed: List[str] = []) -> None:
+        """ Persist saved objects and removed ids in one write
+        """
+        instance_class = cls.__name__
+        if persistence_mode == "group":
+            cls.mark_dirty()
+        elif storage.row_writes:
+            rows = [(obj.id, obj._serialized()) for obj in saved]
+            with cls._lock():
+                storage.write_rows(instance_class, rows, removed)
+            cls._written(saved, removed)
+        elif persistence_mode == "journal":
+            records = [{'op': 'save', 'obj': obj.to_json(True)}
+                       for obj in saved]
+            records += [{'op': 'remove', 'id': obj_id} for obj_id in removed]
+            cls.append_to_journal(*records)
+            cls._written(saved, removed)
+        else:
+            cls.save_to_file()
 
     def save(self):
         """ Save current object
         """
-        instance_class = self.__class__.__name__
-        self.updated_at = datetime.utcnow()
-        dict_data[instance_class][self.id] = self
-        self.__class__.save_to_file()
+        self._store()
+        self.__class__._persist(saved=[self])
 
     def remove(self):
         """ Remove object
         """
-        instance_class = self.__class__.__name__
-        if dict_data[instance_class].get(self.id) is not None:
-            del dict_data[instance_class][self.id]
-            self.__class__.save_to_file()
+        if self._unstore():
+            self.__class__._persist(removed=[self.id])
+
+    @classmethod
+    def save_many(cls, objs: List[TypeVar('Base')]) -> None:
+        """ Save all objects, writing to storage once
+        """
+        for obj in objs:
+            obj._store()
+        if len(objs) > 0:
+            cls._persist(saved=objs)
+
+    @classmethod
+    def remove_many(cls, objs: List[TypeVar('Base')]) -> int:
+        """ Remove all objects, writing to storage once,
+            return the number of objects removed
+        """
+        removed = [obj.id for obj in objs if obj._unstore()]
+        if len(removed) > 0:
+            cls._persist(removed=removed)
+        return len(removed)
 
     @classmethod
     def count(cls) -> int:
         """ Count all objects
         """
+        cls.sync()
         instance_class = cls.__name__
         return len(dict_data[instance_class].keys())
 
@@ -122,13 +677,39 @@ class Base():
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
         """
+        cls.sync()
+        return cls._hydrate(id)
+
+    @classmethod
+    def _index_candidates(cls, attributes: dict) -> List[TypeVar('Base')]:
+        """ Return objects matching the indexed part of attributes,
+            None if no indexed attribute can be used
+        """
         instance_class = cls.__name__
-        return dict_data[instance_class].get(id)
+        index = dict_index.get(instance_class)
+        if index is None:
+            return None
+        ids = None
+        for k, v in attributes.items():
+            entries = index['attrs'].get(k)
+            if entries is None:
+                continue
+            try:
+                found = entries.get(v, set())
+            except TypeError:
+                continue
+            ids = set(found) if ids is None else ids & found
+            if len(ids) == 0:
+                break
+        if ids is None:
+            return None
+        return [cls._hydrate(obj_id) for obj_id in ids]
 
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """ Search all objects with matching attributes
         """
+        cls.sync()
         instance_class = cls.__name__
 
         def _search(obj):
@@ -138,5 +719,279 @@ class Base():
                 if (getattr(obj, k) != v):
                     return False
             return True
-        return list(filter(_search, dict_data[instance_class].values()))
+        candidates = None
+        if len(attributes) > 0:
+            candidates = cls._index_candidates(attributes)
+        if candidates is None and len(attributes) > 0 and \
+                search_mode == "columnar":
+            store = cls._column_store()
+            if store.covers(attributes):
+                with cls._lock():
+                    ids = store.match(equal=attributes)
+                candidates = [cls._hydrate(obj_id) for obj_id in ids]
+        if candidates is None:
+            snapshot = list(dict_data[instance_class].items())
+            candidates = [cls._hydrate(obj_id) if _is_record(obj)
+                          else obj for obj_id, obj in snapshot]
+        return [obj for obj in candidates
+                if obj is not None and _search(obj)]
+
+    @classmethod
+    def _sorted_ids(cls) -> List[str]:
+        """ Return the ids of the class sorted, built on first use
+        """
+        instance_class = cls.__name__
+        order = dict_order.get(instance_class)
+        if order is None:
+            with cls._lock():
+                order = dict_order.get(instance_class)
+                if order is None:
+                    order = sorted(dict_data[instance_class])
+                    dict_order[instance_class] = order
+        return order
+
+    @classmethod
+    def page(cls, attributes: dict = {}, limit: int = 100,
+             cursor: str = None) -> Tuple[List[TypeVar('Base')], str]:
+        """ Return up to limit objects with matching attributes,
+            in id order, starting after the cursor
+
+            The returned cursor continues the listing, it is None
+            once every object has been returned. limit is capped to
+            BASE_PAGE_MAX_LIMIT
+        """
+        cls.sync()
+        after = ""
+        if cursor is not None:
+            try:
+                after = json.loads(base64.urlsafe_b64decode(
+                    cursor.encode()))["after"]
+            except Exception:
+                raise ValueError("Invalid cursor")
+            if not isinstance(after, str):
+                raise ValueError("Invalid cursor")
+        if limit <= 0:
+            raise ValueError("Invalid limit")
+        limit = min(limit, page_max_limit)
+        results = []
+        last_id = after
+        while len(results) < limit:
+            with cls._lock():
+                order = cls._sorted_ids()
+                position = bisect.bisect_right(order, last_id)
+                window = order[position:position + limit]
+            if len(window) == 0:
+                return results, None
+            for obj_id in window:
+                last_id = obj_id
+                obj = cls._hydrate(obj_id)
+                if obj is None:
+                    continue
+                if all(getattr(obj, k) == v for k, v in attributes.items()):
+                    results.append(obj)
+                    if len(results) == limit:
+                        break
+        with cls._lock():
+            order = cls._sorted_ids()
+            if bisect.bisect_right(order, last_id) == len(order):
+                return results, None
+        next_cursor = base64.urlsafe_b64encode(
+            json.dumps({"after": last_id}).encode()).decode()
+        return results, next_cursor
+
+    @classmethod
+    def iterate(cls, attributes: dict = {},
+                batch: int = 100) -> Iterable[TypeVar('Base')]:
+        """ Yield every object with matching attributes, in id order,
+            holding at most one batch at a time
+        """
+        objs, cursor = cls.page(attributes, batch)
+        yield from objs
+        while cursor is not None:
+            objs, cursor = cls.page(attributes, batch, cursor)
+            yield from objs
+
+    @classmethod
+    def _updated_index(cls) -> dict:
+        """ Return the updated_at ordered index, built on first use
+        """
+        instance_class = cls.__name__
+        index = dict_updated.get(instance_class)
+        if index is None:
+            with cls._lock():
+                index = dict_updated.get(instance_class)
+                if index is None:
+                    keys = []
+                    by_id = {}
+                    for obj_id, obj in dict_data[instance_class].items():
+                        if _is_record(obj):
+                            stamp = _record(obj).get('updated_at')
+                        else:
+                            stamp = obj.updated_at.strftime(time_date_fromat)
+                        keys.append((stamp, obj_id))
+                        by_id[obj_id] = stamp
+                    keys.sort()
+                    index = {'keys': keys, 'by_id': by_id}
+                    dict_updated[instance_class] = index
+        return index
+
+    @classmethod
+    def _updated_set(cls, obj_id: str, stamp: str) -> None:
+        """ Move one object to its updated_at position
+        """
+        cls._updated_unset(obj_id)
+        index = dict_updated[cls.__name__]
+        bisect.insort(index['keys'], (stamp, obj_id))
+        index['by_id'][obj_id] = stamp
+
+    @classmethod
+    def _updated_unset(cls, obj_id: str) -> None:
+        """ Remove one object from the updated_at index
+        """
+        index = dict_updated[cls.__name__]
+        stamp = index['by_id'].pop(obj_id, None)
+        if stamp is None:
+            return
+        position = bisect.bisect_left(index['keys'], (stamp, obj_id))
+        if position < len(index['keys']) and \
+                index['keys'][position] == (stamp, obj_id):
+            del index['keys'][position]
+
+    @classmethod
+    def _tombstone(cls, obj_id: str) -> None:
+        """ Record the removal of one object, keeping at most
+            tombstone_max of them
+        """
+        instance_class = cls.__name__
+        tombstones = dict_tombstones.setdefault(instance_class, {
+            'horizon': datetime.utcnow().strftime(time_date_fromat),
+            'entries': deque(maxlen=tombstone_max)
+        })
+        stamp = datetime.utcnow().strftime(time_date_fromat)
+        entries = tombstones['entries']
+        if len(entries) == entries.maxlen:
+            tombstones['horizon'] = entries[0][0] if len(entries) > 0 \
+                else stamp
+        entries.append((stamp, obj_id))
+
+    @classmethod
+    def changed_since(cls, since: str) -> Tuple[List[TypeVar('Base')],
+                                                List[str], str]:
+        """ Return the objects updated at or after since, the ids of
+            the objects removed at or after since, and the since value
+            of the next call
+
+            Local writes are stamped under the class lock, so every
+            write older than the read is in it; writes of other
+            processes are seen up to BASE_SYNC_INTERVAL (plus
+            BASE_FLUSH_INTERVAL in group mode) late, so the next since
+            is moved back by that lag
+
+            Raise ValueError when removals that old are not known
+            anymore, a full listing is needed then
+        """
+        cls.sync()
+        datetime.strptime(since, time_date_fromat)
+        instance_class = cls.__name__
+        lag = 0.0
+        if sync_interval is not None:
+            lag = float(sync_interval) + 1
+            if persistence_mode == "group":
+                lag += flush_interval
+        with cls._lock():
+            until = (datetime.utcnow() - timedelta(seconds=lag)).strftime(
+                time_date_fromat)
+            tombstones = dict_tombstones.get(instance_class)
+            if tombstones is None or since <= tombstones['horizon']:
+                raise ValueError("updated_since is older than the "
+                                 "removal history")
+            keys = cls._updated_index()['keys']
+            position = bisect.bisect_left(keys, (since, ""))
+            ids = [obj_id for _, obj_id in keys[position:]]
+            removed = []
+            for stamp, obj_id in reversed(tombstones['entries']):
+                if stamp < since:
+                    break
+                if obj_id not in dict_data[instance_class]:
+                    removed.append(obj_id)
+            removed.reverse()
+        objs = [cls._hydrate(obj_id) for obj_id in ids]
+        return [obj for obj in objs if obj is not None], removed, \
+            max(since, until)
+
+    @classmethod
+    def query(cls, equal: dict = {}, prefix: dict = {},
+              between: dict = {}) -> List[TypeVar('Base')]:
+        """ Search all objects through the column store
+
+            equal: attribute -> value
+            prefix: attribute -> string prefix
+            between: attribute -> (start, end) datetimes, None for
+            an open bound
+        """
+        cls.sync()
+        store = cls._column_store()
+        if not store.covers(list(equal) + list(prefix) + list(between)):
+            raise AttributeError("Unknown attribute in query")
+        with cls._lock():
+            ids = store.match(equal=equal, prefix=prefix, between=between)
+        objs = [cls._hydrate(obj_id) for obj_id in ids]
+        return [obj for obj in objs if obj is not None]
+
+
+def _is_record(obj) -> bool:
+    """ Return True when obj is a raw record not built yet
+    """
+    return isinstance(obj, (str, dict))
+
+
+def _record(raw) -> dict:
+    """ Return the attributes of a raw record, JSON text or dict
+    """
+    if isinstance(raw, str):
+        return json.loads(raw)
+    return raw
+
+
+def _encode_record(obj, decoded: bool):
+    """ Return an object or raw record in the storage format:
+        a dict when decoded is True, else JSON text
+    """
+    if decoded:
+        return _record(obj) if _is_record(obj) else obj.to_json(True)
+    if isinstance(obj, dict):
+        return json.dumps(obj)
+    return obj if isinstance(obj, str) else obj._serialized()
+
+
+def _iter_journal(f) -> Iterable[dict]:
+    """ Yield the complete records of a journal opened in binary mode,
+        leaving the file position after the last complete one
+    """
+    while True:
+        start = f.tell()
+        line = f.readline()
+        if not line.endswith(b"\n"):
+            f.seek(start)
+            return
+        try:
+            yield json.loads(line)
+        except ValueError:
+            f.seek(start)
+            return
+
+
+def _flush_loop() -> None:
+    """ Background writer of the group commit mode
+    """
+    while True:
+        with flush_condition:
+            flush_condition.wait(flush_interval)
+        try:
+            Base.flush()
+        except Exception:
+            logger.exception("Group commit failed, retrying in %ss",
+                             flush_interval)
+
 
+atexit.register(Base.flush)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+""" Columnar module
+
+    Column store used by Base for multi-attribute searches
+"""
+from datetime import datetime
+from typing import List
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+epoch = datetime(1970, 1, 1)
+
+
+def to_column_value(value):
+    """ Convert a datetime to seconds since epoch, keep other values
+    """
+    if type(value) is datetime:
+        return (value - epoch).total_seconds()
+    return value
+
+
+class ColumnStore():
+    """ Column store
+
+        One list per attribute, rows addressed by position. NumPy
+        arrays are built from the lists on demand (when NumPy is
+        installed) and dropped on the next write
+    """
+
+    def __init__(self, attributes: List[str]) -> None:
+        """ Initialize a ColumnStore instance
+        """
+        self.attributes = list(attributes)
+        self.ids = []
+        self.rows = {}
+        self.columns = {attr: [] for attr in self.attributes}
+        self.arrays = {}
+
+    def put(self, obj_id: str, values: dict) -> None:
+        """ Insert or update the row of obj_id
+        """
+        row = self.rows.get(obj_id)
+        if row is None:
+            row = len(self.ids)
+            self.rows[obj_id] = row
+            self.ids.append(obj_id)
+            for attr in self.attributes:
+                self.columns[attr].append(None)
+        for attr in self.attributes:
+            self.columns[attr][row] = to_column_value(values.get(attr))
+        self.arrays = {}
+
+    def delete(self, obj_id: str) -> None:
+        """ Delete the row of obj_id, moving the last row in its place
+        """
+        row = self.rows.pop(obj_id, None)
+        if row is None:
+            return
+        last_id = self.ids.pop()
+        for attr in self.attributes:
+            last_value = self.columns[attr].pop()
+            if last_id != obj_id:
+                self.columns[attr][row] = last_value
+        if last_id != obj_id:
+            self.ids[row] = last_id
+            self.rows[last_id] = row
+        self.arrays = {}
+
+    def covers(self, attributes) -> bool:
+        """ Check if every attribute has a column
+        """
+        return all(attr in self.columns for attr in attributes)
+
+    def _array(self, attr: str, kind: str = "value"):
+        """ Return the cached NumPy array of a column
+        """
+        key = (attr, kind)
+        array = self.arrays.get(key)
+        if array is None:
+            column = self.columns[attr]
+            if kind == "str":
+                array = np.array([v if type(v) is str else ""
+                                  for v in column], dtype=str)
+            elif kind == "is_str":
+                array = np.array([type(v) is str for v in column],
+                                 dtype=bool)
+            elif kind == "float":
+                array = np.array([v if type(v) is float else np.nan
+                                  for v in column], dtype=float)
+            else:
+                array = np.empty(len(column), dtype=object)
+                array[:] = column
+            self.arrays[key] = array
+        return array
+
+    def match(self, equal: dict = {}, prefix: dict = {},
+              between: dict = {}) -> List[str]:
+        """ Return the ids of the rows matching every predicate
+
+            equal: attribute -> value
+            prefix: attribute -> string prefix
+            between: attribute -> (low, high), None for an open bound
+        """
+        if np is None:
+            return self._match_python(equal, prefix, between)
+        mask = np.ones(len(self.ids), dtype=bool)
+        for attr, value in equal.items():
+            value = to_column_value(value)
+            if type(value) is float:
+                mask &= self._array(attr, "float") == value
+            else:
+                mask &= self._array(attr) == value
+        for attr, value in prefix.items():
+            mask &= self._array(attr, "is_str")
+            mask &= np.char.startswith(self._array(attr, "str"), value)
+        for attr, (low, high) in between.items():
+            column = self._array(attr, "float")
+            if low is not None:
+                mask &= column >= to_column_value(low)
+            if high is not None:
+                mask &= column <= to_column_value(high)
+        return [self.ids[row] for row in np.flatnonzero(mask)]
+
+    def _match_python(self, equal: dict, prefix: dict,
+                      between: dict) -> List[str]:
+        """ match() over the column lists, without NumPy
+        """
+        rows = range(len(self.ids))
+        for attr, value in equal.items():
+            value = to_column_value(value)
+            column = self.columns[attr]
+            rows = [row for row in rows if column[row] == value]
+        for attr, value in prefix.items():
+            column = self.columns[attr]
+            rows = [row for row in rows if type(column[row]) is str and
+                    column[row].startswith(value)]
+        for attr, (low, high) in between.items():
+            low = to_column_value(low)
+            high = to_column_value(high)
+            column = self.columns[attr]
+            rows = [row for row in rows if type(column[row]) is float and
+                    (low is None or column[row] >= low) and
+                    (high is None or column[row] <= high)]
+        return [self.ids[row] for row in rows]
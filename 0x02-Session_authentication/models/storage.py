@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+""" Storage module
+
+    Persistence backends of Base, selected by BASE_STORAGE:
+    json (default), sqlite or binary
+"""
+from abc import ABC, abstractmethod
+from os import getenv, path
+from typing import Iterable, List
+import json
+import os
+import sqlite3
+import threading
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+load_chunk_size = int(getenv("BASE_LOAD_CHUNK_SIZE", 64 * 1024))
+
+
+class Storage(ABC):
+    """ Storage backend interface
+
+        Records are handled as (id, record) pairs, record being the
+        JSON text of the object, or its decoded dict when decoded is True.
+        Backends with row_writes also write single records through
+        write_rows(instance_class, rows, removed)
+    """
+    row_writes = False
+    decoded = False
+    extension = None
+
+    def path(self, instance_class: str) -> str:
+        """ Return the file holding the class store
+        """
+        return ".db_{}.{}".format(instance_class, self.extension)
+
+    @abstractmethod
+    def read(self, instance_class: str) -> Iterable[tuple]:
+        """ Yield every stored (id, record) pair
+        """
+
+    @abstractmethod
+    def write(self, instance_class: str, items: List[tuple]) -> None:
+        """ Replace the class store with (id, record) items
+        """
+
+    def version(self, instance_class: str):
+        """ Return a value changing whenever the file is rewritten
+        """
+        try:
+            stat = os.stat(self.path(instance_class))
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+class JSONFileStorage(Storage):
+    """ One JSON object per class in .db_<Class>.json
+    """
+    extension = "json"
+
+    def read(self, instance_class: str) -> Iterable[tuple]:
+        """ Yield every stored (id, text) pair, parsing incrementally
+        """
+        file_path = self.path(instance_class)
+        if not path.exists(file_path):
+            return
+        with open(file_path, 'r') as f:
+            yield from iter_json_items(f)
+
+    def write(self, instance_class: str, items: List[tuple]) -> None:
+        """ Rewrite the JSON file atomically
+        """
+        file_path = self.path(instance_class)
+        tmp_path = "{}.tmp".format(file_path)
+        with open(tmp_path, 'w') as f:
+            f.write("{" + ", ".join("{}: {}".format(json.dumps(obj_id), text)
+                                    for obj_id, text in items) + "}")
+        os.replace(tmp_path, file_path)
+
+
+class BinaryFileStorage(Storage):
+    """ Binary snapshot in .db_<Class>.bin
+
+        A msgpack encoded map of id to decoded record, tagged by a
+        4 bytes header; msgpack is required
+    """
+    decoded = True
+    extension = "bin"
+
+    def read(self, instance_class: str) -> Iterable[tuple]:
+        """ Yield every stored (id, record) pair
+        """
+        file_path = self.path(instance_class)
+        if not path.exists(file_path):
+            return
+        with open(file_path, 'rb') as f:
+            header = f.read(4)
+            data = f.read()
+        if header != b"MSGP":
+            raise ValueError("Unknown format of {}".format(file_path))
+        yield from msgpack.unpackb(data, raw=False).items()
+
+    def write(self, instance_class: str, items: List[tuple]) -> None:
+        """ Rewrite the binary file atomically
+        """
+        file_path = self.path(instance_class)
+        tmp_path = "{}.tmp".format(file_path)
+        records = dict(items)
+        with open(tmp_path, 'wb') as f:
+            f.write(b"MSGP")
+            f.write(msgpack.packb(records, use_bin_type=True))
+        os.replace(tmp_path, file_path)
+
+
+class SQLiteStorage(Storage):
+    """ One SQLite table per class in .db_<Class>.sqlite
+
+        Rows hold the record text and are written one by one; lookups
+        by attribute go through the in-memory indexes of Base
+    """
+    row_writes = True
+    extension = "sqlite"
+
+    def __init__(self) -> None:
+        """ Initialize a SQLiteStorage instance
+        """
+        self.connections = {}
+        self.lock = threading.RLock()
+
+    def _connection(self, instance_class: str) -> sqlite3.Connection:
+        """ Return the connection to the class database,
+            creating its table on first use
+        """
+        connection = self.connections.get(instance_class)
+        if connection is None:
+            connection = sqlite3.connect(self.path(instance_class),
+                                         check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS records "
+                "(id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+            self.connections[instance_class] = connection
+        return connection
+
+    def read(self, instance_class: str) -> Iterable[tuple]:
+        """ Yield every stored (id, text) pair
+        """
+        if not path.exists(self.path(instance_class)):
+            return
+        with self.lock:
+            connection = self._connection(instance_class)
+            rows = connection.execute(
+                "SELECT id, data FROM records").fetchall()
+        yield from rows
+
+    def write(self, instance_class: str, items: List[tuple]) -> None:
+        """ Replace every row in one transaction
+        """
+        with self.lock:
+            connection = self._connection(instance_class)
+            with connection:
+                connection.execute("DELETE FROM records")
+                connection.executemany(
+                    "INSERT INTO records (id, data) VALUES (?, ?)", items)
+
+    def write_rows(self, instance_class: str, rows: List[tuple],
+                   removed: List[str]) -> None:
+        """ Upsert (id, text) rows and delete removed ids in one
+            transaction
+        """
+        if len(rows) == 0 and len(removed) == 0:
+            return
+        with self.lock:
+            connection = self._connection(instance_class)
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO records (id, data) "
+                    "VALUES (?, ?)", rows)
+                connection.executemany("DELETE FROM records WHERE id = ?",
+                                       [(obj_id,) for obj_id in removed])
+
+    def version(self, instance_class: str):
+        """ Return the data version, which changes only on commits
+            made by other connections
+        """
+        if not path.exists(self.path(instance_class)):
+            return None
+        with self.lock:
+            connection = self._connection(instance_class)
+            return connection.execute("PRAGMA data_version").fetchone()[0]
+
+
+def iter_json_items(f) -> Iterable[tuple]:
+    """ Yield (key, raw JSON text) pairs of a top-level JSON object,
+        reading the file by chunks of load_chunk_size
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    started = False
+    eof = False
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,:":
+            pos += 1
+        if pos < len(buffer):
+            if not started:
+                if buffer[pos] != "{":
+                    raise ValueError("Expecting a JSON object")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "}":
+                return
+            try:
+                key, key_end = decoder.raw_decode(buffer, pos)
+                value_start = key_end
+                while value_start < len(buffer) and \
+                        buffer[value_start] in " \t\r\n:":
+                    value_start += 1
+                _, value_end = decoder.raw_decode(buffer, value_start)
+            except ValueError:
+                if eof:
+                    raise
+            else:
+                yield key, buffer[value_start:value_end]
+                pos = value_end
+                continue
+        if eof:
+            return
+        chunk = f.read(load_chunk_size)
+        eof = len(chunk) == 0
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def get_storage(name: str = None) -> Storage:
+    """ Return the backend called name, BASE_STORAGE by default
+
+        Raise ImportError for binary when msgpack is not installed
+    """
+    if name is None:
+        name = getenv("BASE_STORAGE", "json")
+    if name == "sqlite":
+        return SQLiteStorage()
+    if name == "binary":
+        if msgpack is None:
+            raise ImportError("BASE_STORAGE=binary requires msgpack")
+        return BinaryFileStorage()
+    return JSONFileStorage()
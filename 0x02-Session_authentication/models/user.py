@@ -7,6 +7,8 @@ import hashlib
 
 class User(Base):
     """User class"""
+    __slots__ = ("email", "_password", "first_name", "last_name")
+    indexed_attributes = ["email"]
 
     def __init__(self, *args: list, **kwargs: dict) -> None:
         """Initialize a User instance"""
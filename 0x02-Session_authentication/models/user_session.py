@@ -5,14 +5,20 @@ from models.base import Base
 from typing import TypeVar, List, Iterable
 from os import path
 import json
+import sys
 import uuid
 
 
 class UserSession(Base):
     """Users Sessions Class"""
+    __slots__ = ("user_id", "session_id")
+    indexed_attributes = ["session_id"]
 
     def __init__(self, *args: list, **kwargs: dict) -> None:
         """Start the user session"""
         super().__init__(*args, **kwargs)
-        self.user_id = kwargs.get("user_id")
+        user_id = kwargs.get("user_id")
+        if type(user_id) is str:
+            user_id = sys.intern(user_id)
+        self.user_id = user_id
         self.session_id = kwargs.get("session_id")
@@ -4,12 +4,16 @@
 
 from flask import Flask, abort, jsonify, redirect, request
 from flask.helpers import make_response
+import math
 
 from auth import Auth
 from db import DB
+from hashing import HashingPoolFull, calibration_report
+from throttle import LoginThrottle
 from user import User
 
 AUTH = Auth()
+THROTTLE = LoginThrottle()
 
 app = Flask(__name__)
 
@@ -22,6 +26,8 @@ def users() -> str:
     try:
         AUTH.register_user(body_email, body_password)
         return jsonify({"email": body_email, "message": "User created"})
+    except HashingPoolFull:
+        return jsonify({"message": "Server busy, retry later"}), 503
     except Exception:
         return jsonify({"message": "Email already registered"}), 400
 
@@ -32,7 +38,16 @@ def login():
     req = request.form
     body_password = req.get("password", "")
     body_email = req.get("email", "")
-    check_log = AUTH.valid_login(body_email, body_password)
+    wait = THROTTLE.acquire(body_email, request.remote_addr)
+    if wait > 0:
+        res = make_response(jsonify({"message": "Too many login attempts"}),
+                            429)
+        res.headers["Retry-After"] = str(math.ceil(wait))
+        return res
+    try:
+        check_log = AUTH.valid_login(body_email, body_password)
+    except HashingPoolFull:
+        return jsonify({"message": "Server busy, retry later"}), 503
     if not check_log:
         abort(401)
     res = make_response(jsonify({"email": body_email, "message": "Logged in"}))
@@ -40,6 +55,12 @@ def login():
     return res
 
 
+@app.route("/stats", methods=["GET"], strict_slashes=False)
+def stats() -> str:
+    """Return the login throttling counters"""
+    return jsonify({"login_throttle": THROTTLE.stats()})
+
+
 @app.route("/sessions", methods=["DELETE"], strict_slashes=False)
 def logout():
     """Delete the session ID"""
@@ -81,10 +102,13 @@ def update_password() -> str:
     new_password = request.form.get("new_password")
     try:
         AUTH.update_password(reset_token, new_password)
+    except HashingPoolFull:
+        return jsonify({"message": "Server busy, retry later"}), 503
     except Exception:
         abort(403)
     return jsonify({"email": body_emai, "message": "Password updated"}), 200
 
 
 if __name__ == "__main__":
+    print(calibration_report())
     app.run(host="0.0.0.0", port="5000")
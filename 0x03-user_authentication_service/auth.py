@@ -7,14 +7,15 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.exc import InvalidRequestError
 from db import DB
+from hashing import get_pool, needs_rehash
 from user import User
-import bcrypt
+import threading
 import uuid
 
 
 def _hash_password(password: str) -> str:
     """Hash a password."""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    return get_pool().hash(password)
 
 
 def _generate_uuid() -> str:
@@ -28,6 +29,8 @@ class Auth:
     def __init__(self):
         """Initialize a new DB instance."""
         self._db = DB()
+        self._rehashes = set()
+        self._rehashes_lock = threading.Lock()
 
     def register_user(self, email: str, password: str) -> User:
         """Register a new user."""
@@ -43,12 +46,52 @@ class Auth:
         """Check if a login is valid."""
         try:
             user = self._db.find_user_by(email=email)
-            if bcrypt.checkpw(password.encode('utf-8'), user.bcrypt_passwd):
+            if get_pool().check(password, user.bcrypt_passwd):
+                self._rehash(user, password)
                 return True
         except NoResultFound:
             pass
         return False
 
+    def _rehash(self, user: User, password: str) -> None:
+        """Start a background rehash of password for user if its hash
+        cost is below the calibrated one."""
+        if not needs_rehash(user.bcrypt_passwd):
+            return
+        with self._rehashes_lock:
+            if user.id in self._rehashes:
+                return
+            self._rehashes.add(user.id)
+        try:
+            future = get_pool().hash_async(password)
+        except Exception:
+            with self._rehashes_lock:
+                self._rehashes.discard(user.id)
+            return
+        user_id, old_hash = user.id, user.bcrypt_passwd
+        future.add_done_callback(
+            lambda done: self._store_rehash(user_id, old_hash, done))
+
+    def _store_rehash(self, user_id: int, old_hash: bytes,
+                      future) -> None:
+        """Store a finished rehash with its own DB session, unless the
+        password changed meanwhile."""
+        try:
+            if future.exception() is not None:
+                return
+            session = sessionmaker(bind=self._db._engine)()
+            try:
+                user = session.query(User).filter_by(
+                    id=user_id, bcrypt_passwd=old_hash).first()
+                if user is not None:
+                    user.bcrypt_passwd = future.result()
+                    session.commit()
+            finally:
+                session.close()
+        finally:
+            with self._rehashes_lock:
+                self._rehashes.discard(user_id)
+
     def create_session(self, email: str) -> str | None:
         """Create a new session for a user."""
         session_id = _generate_uuid()
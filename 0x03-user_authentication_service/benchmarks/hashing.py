@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""Login throughput benchmark
+
+Run bcrypt password checks through HashingPool with 1 worker up to
+one worker per core. Run from the project root:
+
+    python3 -m benchmarks.hashing [logins] [rounds]
+"""
+
+from hashing import HashingPool
+from os import cpu_count
+import bcrypt
+import sys
+import time
+
+
+def throughput(workers: int, logins: int, hashed: bytes) -> float:
+    """Logins checked per second by a pool of workers processes."""
+    pool = HashingPool(workers=workers, max_pending=logins, timeout=60)
+    pool.check("warmup", hashed)
+    start = time.perf_counter()
+    futures = [pool.check_async("password", hashed) for _ in range(logins)]
+    assert all(future.result() for future in futures)
+    elapsed = time.perf_counter() - start
+    pool.shutdown()
+    return logins / elapsed
+
+
+if __name__ == "__main__":
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    hashed = bcrypt.hashpw(b"password", bcrypt.gensalt(rounds))
+    start = time.perf_counter()
+    for _ in range(min(logins, 8)):
+        bcrypt.checkpw(b"password", hashed)
+    inline = min(logins, 8) / (time.perf_counter() - start)
+    print("inline        {:>8.1f} logins/s".format(inline))
+    workers = 1
+    while True:
+        print("{:>2} workers    {:>8.1f} logins/s".format(
+            workers, throughput(workers, logins, hashed)))
+        if workers >= (cpu_count() or 1):
+            break
+        workers = min(workers * 2, cpu_count() or 1)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Password hashing pool
+
+Runs bcrypt off the request thread in a process pool sized to the
+cores, with a bounded number of pending jobs. The bcrypt cost is
+calibrated on first use to hit a target hash latency. Run this module
+to print the calibration:
+
+    python3 hashing.py [target_ms]
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from os import cpu_count, getenv
+import bcrypt
+import multiprocessing
+import sys
+import threading
+import time
+
+
+class HashingPoolFull(RuntimeError):
+    """Raised when too many hashing jobs are already pending."""
+
+
+class HashingPool:
+    """Process pool running bcrypt jobs."""
+
+    def __init__(self, workers: int = None, max_pending: int = None,
+                 timeout: float = None) -> None:
+        """Initialize a pool of workers processes, accepting at most
+        max_pending jobs and waiting up to timeout seconds for a slot.
+        Workers are started by a forkserver, never forked from a
+        request thread."""
+        if workers is None:
+            workers = int(getenv("HASH_POOL_WORKERS", cpu_count() or 1))
+        if max_pending is None:
+            max_pending = int(getenv("HASH_POOL_MAX_PENDING", workers * 8))
+        if timeout is None:
+            timeout = float(getenv("HASH_POOL_TIMEOUT", 1.0))
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("forkserver"))
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs queued or running."""
+        return self._pending
+
+    def submit(self, fn, *args) -> Future:
+        """Queue a job, raise HashingPoolFull if no slot frees up
+        within the timeout."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HashingPoolFull("Too many pending hashing jobs")
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self) -> None:
+        """Free the slot of a finished job."""
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def hash_async(self, password: str, rounds: int = None) -> Future:
+        """Future of the bcrypt hash of password, with the calibrated
+        cost unless rounds is given."""
+        if rounds is None:
+            rounds = get_rounds()
+        return self.submit(bcrypt.hashpw, password.encode('utf-8'),
+                           bcrypt.gensalt(rounds))
+
+    def check_async(self, password: str, hashed_password: bytes) -> Future:
+        """Future telling if password matches hashed_password."""
+        return self.submit(bcrypt.checkpw, password.encode('utf-8'),
+                           hashed_password)
+
+    def hash(self, password: str, rounds: int = None) -> bytes:
+        """Bcrypt hash of password."""
+        return self.hash_async(password, rounds).result()
+
+    def check(self, password: str, hashed_password: bytes) -> bool:
+        """Check if password matches hashed_password."""
+        return self.check_async(password, hashed_password).result()
+
+    def shutdown(self) -> None:
+        """Wait for the pending jobs and stop the workers."""
+        self._executor.shutdown(wait=True)
+
+
+def calibrate(target_ms: float = None, min_rounds: int = None,
+              max_rounds: int = 16) -> tuple:
+    """Pick the highest bcrypt cost hashing within target_ms on this
+    machine, never below min_rounds. Return the cost and the measured
+    milliseconds per cost."""
+    if target_ms is None:
+        target_ms = float(getenv("BCRYPT_TARGET_MS", 250))
+    if min_rounds is None:
+        min_rounds = int(getenv("BCRYPT_MIN_ROUNDS", 12))
+    chosen = min_rounds
+    timings = {}
+    for rounds in range(min_rounds, max_rounds + 1):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds))
+        timings[rounds] = (time.perf_counter() - start) * 1000
+        if timings[rounds] > target_ms:
+            break
+        chosen = rounds
+    return chosen, timings
+
+
+def hash_rounds(hashed_password) -> int:
+    """Cost factor of a bcrypt hash, None if it cannot be read."""
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode('utf-8')
+    try:
+        return int(hashed_password.split(b"$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed_password) -> bool:
+    """Check if a hash should be redone at the current cost: when it is
+    lower, or different if BCRYPT_ALLOW_DOWNGRADE is set. Unreadable
+    hashes are always redone."""
+    rounds = hash_rounds(hashed_password)
+    if rounds is None:
+        return True
+    if getenv("BCRYPT_ALLOW_DOWNGRADE"):
+        return rounds != get_rounds()
+    return rounds < get_rounds()
+
+
+_rounds = None
+_timings = {}
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_rounds() -> int:
+    """bcrypt cost of new hashes: BCRYPT_ROUNDS when set, calibrated
+    on first use otherwise."""
+    global _rounds, _timings
+    if _rounds is None:
+        with _pool_lock:
+            if _rounds is None:
+                if getenv("BCRYPT_ROUNDS"):
+                    _rounds = int(getenv("BCRYPT_ROUNDS"))
+                else:
+                    _rounds, _timings = calibrate()
+    return _rounds
+
+
+def calibration_report() -> str:
+    """Chosen cost and the timings measured to choose it."""
+    rounds = get_rounds()
+    lines = ["bcrypt cost: {}".format(rounds)]
+    for cost, ms in sorted(_timings.items()):
+        lines.append("  cost {:>2}: {:>8.1f} ms".format(cost, ms))
+    return "\n".join(lines)
+
+
+def get_pool() -> HashingPool:
+    """Shared pool, created on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool()
+    return _pool
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        _rounds, _timings = calibrate(float(sys.argv[1]))
+    print(calibration_report())
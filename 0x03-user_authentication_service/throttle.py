@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Login throttling
+
+Token buckets limiting login attempts per email and per client IP,
+checked before any password hashing.
+"""
+from collections import OrderedDict
+from os import getenv
+import threading
+import time
+
+
+class TokenBuckets:
+    """Token buckets keyed by string.
+
+    A bucket holds up to burst tokens, refilled at per_minute tokens per
+    minute, and is stored as a (tokens, timestamp) tuple only while it
+    is not full. Buckets are kept least recently taken first, and at
+    most max_buckets of them are held.
+    """
+
+    def __init__(self, burst: int, per_minute: float,
+                 max_buckets: int) -> None:
+        """Initialize a TokenBuckets instance."""
+        self.burst = burst
+        self.rate = per_minute / 60.0
+        self.max_buckets = max(1, max_buckets)
+        self.buckets = OrderedDict()
+
+    def level(self, key: str, now: float) -> float:
+        """Return the tokens left in the bucket of key."""
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            return self.burst
+        tokens, last = bucket
+        return min(self.burst, tokens + (now - last) * self.rate)
+
+    def wait(self, level: float) -> float:
+        """Return the seconds until a bucket at level holds one token,
+        a day when buckets are never refilled."""
+        if level >= 1:
+            return 0.0
+        if self.rate <= 0:
+            return 86400.0
+        return (1 - level) / self.rate
+
+    def take(self, key: str, level: float, now: float) -> int:
+        """Remove one token from the bucket of key, dropping the least
+        recently taken buckets past max_buckets, return how many."""
+        self.buckets[key] = (level - 1, now)
+        self.buckets.move_to_end(key)
+        dropped = 0
+        while len(self.buckets) > self.max_buckets:
+            self.buckets.popitem(last=False)
+            dropped += 1
+        return dropped
+
+    def evict(self, now: float) -> int:
+        """Drop the least recently taken buckets refilled to burst, up to
+        the first one still refilling, return how many."""
+        evicted = 0
+        for key in self.buckets:
+            if self.level(key, now) < self.burst:
+                break
+            evicted += 1
+        for _ in range(evicted):
+            self.buckets.popitem(last=False)
+        return evicted
+
+
+class LoginThrottle:
+    """Login attempts limiter.
+
+    An attempt takes one token from the bucket of its email and one from
+    the bucket of its client IP, and is rejected when either is empty.
+    """
+
+    def __init__(self) -> None:
+        """Initialize a LoginThrottle instance."""
+        max_buckets = int(getenv("LOGIN_THROTTLE_MAX_BUCKETS", 10000))
+        self.emails = TokenBuckets(
+            int(getenv("LOGIN_EMAIL_BURST", 5)),
+            float(getenv("LOGIN_EMAIL_PER_MINUTE", 5)), max_buckets)
+        self.ips = TokenBuckets(
+            int(getenv("LOGIN_IP_BURST", 20)),
+            float(getenv("LOGIN_IP_PER_MINUTE", 60)), max_buckets)
+        self.lock = threading.Lock()
+        self.counters = {"allowed": 0, "rejected_email": 0,
+                         "rejected_ip": 0, "evicted": 0, "dropped": 0}
+
+    def acquire(self, email: str, ip: str) -> float:
+        """Count a login attempt. Return 0 when it is allowed, else the
+        seconds to wait before retrying."""
+        email = (email or "").strip().lower()
+        ip = ip or ""
+        now = time.monotonic()
+        with self.lock:
+            self.counters["evicted"] += self.emails.evict(now) + \
+                self.ips.evict(now)
+            email_level = self.emails.level(email, now)
+            ip_level = self.ips.level(ip, now)
+            if ip_level < 1:
+                self.counters["rejected_ip"] += 1
+                return self.ips.wait(ip_level)
+            if email_level < 1:
+                self.counters["rejected_email"] += 1
+                return self.emails.wait(email_level)
+            self.counters["dropped"] += \
+                self.emails.take(email, email_level, now) + \
+                self.ips.take(ip, ip_level, now)
+            self.counters["allowed"] += 1
+            return 0.0
+
+    def stats(self) -> dict:
+        """Return the counters and the number of buckets held."""
+        with self.lock:
+            stats = dict(self.counters)
+            stats["email_buckets"] = len(self.emails.buckets)
+            stats["ip_buckets"] = len(self.ips.buckets)
+        return stats